@@ -4,14 +4,25 @@ Uses real Foodoscope API for recipe data.
 Run: python api.py
 """
 
+import gzip
+import hashlib
+import json
+import logging
 import os
-from flask import Flask, request, jsonify
+import threading
+import time
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flavor_bridge import (
     recommend_recipes, 
+    recommend_recipes_batch,
+    recommend_recipes_stages,
     fetch_recipe_by_title, 
     fetch_recipe_instructions, 
     fetch_recipes_by_region,
+    add_recipe_observer,
+    recommendation_dependencies,
+    resolve_top_k,
     API_BASE_URL
 )
 from src.data.mock_data import (
@@ -22,8 +33,22 @@ from src.data.mock_data import (
     INITIAL_USER_PROFILE,
     INITIAL_SETTINGS,
     MOCK_RESTAURANTS,
+    MOCK_RECIPES,
 )
-import requests
+import cache
+import compression
+import metrics
+import profiling
+import search_index
+import singleflight
+import substitutes
+import upstream
+from autocomplete import AUTOCOMPLETE
+from json_provider import FastJSONProvider
+from logging_setup import configure_logging
+
+configure_logging()
+logger = logging.getLogger("flavorbridge.api")
 
 # Get API token from environment variable
 API_KEY = os.getenv('API_KEY', 'Y2OYhJpk2OjKmCic-fmVCm_BPXuhBc2N75hZukqjQstOyFPF')
@@ -33,19 +58,122 @@ API_HEADERS = {
 }
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+compression.init_app(app)
 CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000"])
 
-from collections import Counter
+# --- Request Metrics ---
+# Server-Timing lets browser devtools show per-stage pipeline time; off by default
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+HTTP_REQUESTS = metrics.Counter("flavorbridge_http_requests_total", "HTTP requests handled.", ("route", "method", "status"))
+HTTP_SECONDS = metrics.Histogram("flavorbridge_http_request_seconds", "HTTP request handling time.", ("route", "method"))
+
+
+@app.before_request
+def _start_request_metrics():
+    request.environ["flavorbridge.start"] = time.perf_counter()
+    metrics.begin_request()
+
+
+@app.after_request
+def _finish_request_metrics(response):
+    start = request.environ.get("flavorbridge.start")
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    HTTP_SECONDS.observe(elapsed, route=route, method=request.method)
+    # A streamed body does its work after this hook runs, so its timings would be empty
+    if SERVER_TIMING and not response.is_streamed:
+        response.headers["Server-Timing"] = metrics.server_timing_header(metrics.request_timings(), elapsed)
+    return response
+
+
+# --- Recommendation Result Cache ---
+# Serialized /api/recommend bodies keyed by normalized inputs. An entry also
+# dies with the recipe/region/instructions cache entries it was built from.
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+RESULT_CACHE = cache.TTLCache("recommend_results", maxsize=int(os.getenv("RESULT_CACHE_SIZE", "1024")), ttl=RESULT_CACHE_TTL)
+BATCH_MAX_ITEMS = int(os.getenv("RECOMMEND_BATCH_MAX_ITEMS", "50"))
+
+
+def _normalize_text(text) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def _result_cache_key(source: str, target: str, excluded: list[str], top_k: int | None) -> tuple:
+    return (_normalize_text(source), _normalize_text(target), tuple(sorted(set(excluded))), resolve_top_k(top_k))
+
+
+def _cached_result(key: tuple) -> bytes | None:
+    entry = RESULT_CACHE.get(key)
+    if entry is cache.MISSING:
+        return None
+    body, deps = entry
+    # Any dependency refreshed, evicted or invalidated since -> recompute
+    if any(dep_cache.expires_at(dep_key) != expires for dep_cache, dep_key, expires in deps):
+        RESULT_CACHE.invalidate(key)
+        return None
+    return body
+
+
+def _store_result(key: tuple, body: bytes, source: str, target: str) -> None:
+    deps = recommendation_dependencies(source, target)
+    if deps is None:
+        return  # Built from an uncached (failed) fetch - don't reuse it
+    pinned = [(dep_cache, dep_key, dep_cache.expires_at(dep_key)) for dep_cache, dep_key in deps]
+    if any(expires is None for _, _, expires in pinned):
+        return
+    ttl = min([RESULT_CACHE_TTL] + [expires - time.monotonic() for _, _, expires in pinned])
+    RESULT_CACHE.set(key, (body, tuple(pinned)), ttl=ttl)
+
+
+# Every recipe list seen upstream feeds the local title search index
+add_recipe_observer(search_index.add_recipes)
+
+# Typeahead knows the mock catalogue up front and learns titles from upstream responses
+AUTOCOMPLETE.add_titles(recipe["title"] for recipes in MOCK_RECIPES.values() for recipe in recipes)
+add_recipe_observer(AUTOCOMPLETE.add_recipes)
+
+# --- Startup Work ---
+# Disk loads and background threads start with the first request rather than at
+# import, so importing api (scripts, tooling, the reloader's watcher process)
+# has no side effects.
+SUBSTITUTE_WARMUP = os.getenv("SUBSTITUTE_WARMUP", "true").lower() in ("1", "true", "yes")
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_background_services() -> None:
+    """Load persisted state and start background work. Safe to call more than once."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        # Persisted search index, saved periodically; typeahead learns its titles too
+        search_index.start_persistence()
+        AUTOCOMPLETE.add_titles(recipe.get("Recipe_title", "") for recipe in search_index.INDEX.snapshot())
+        # Serve known allergens from the precomputed substitute table (filled in the background)
+        logger.info("Substitute table loaded: %d allergens from %s",
+                    substitutes.load_table(), substitutes.SUBSTITUTE_TABLE_PATH)
+        if SUBSTITUTE_WARMUP:
+            substitutes.start_warmup(API_HEADERS)
+
+
+@app.before_request
+def _ensure_started():
+    if not _started:
+        start_background_services()
+
 
 @app.route("/api/allergen/substitutes", methods=["POST"])
 def get_allergen_substitutes():
     """
     Use FlavorDB API to find molecularly-similar substitutes for an allergen.
-    Steps:
-      1. Find entity by readable name → get dominant category
-      2. Pick best matching entity alias from that category
-      3. Call by-alias to get top similar entities
-      4. Return top 3 as substitutes
+    The FlavorDB chain (entity search -> dominant category -> by-alias) runs in
+    substitutes.py and is cached per normalized allergen.
     """
     data = request.get_json() or {}
     allergen = data.get("allergen", "").strip()
@@ -53,143 +181,27 @@ def get_allergen_substitutes():
     if not allergen:
         return jsonify({"error": "allergen is required"}), 400
 
-    print(f"\n{'🚨'*20}")
-    print(f"  ALLERGEN SUBSTITUTE REQUEST RECEIVED")
-    print(f"  Allergen: '{allergen}'")
-    print(f"{'🚨'*20}")
-
+    logger.info("Allergen substitute request: allergen=%r", allergen)
     try:
-        # ── STEP 1: Search FlavorDB by readable name ──────────────────────────
-        print(f"\n  [STEP 1] Searching FlavorDB for entity: '{allergen.lower()}'")
-        search_url = "https://api.foodoscope.com/flavordb/entities/by-entity-alias-readable"
-        search_resp = requests.get(
-            search_url,
-            params={"entity_alias_readable": allergen.lower()},
-            headers=API_HEADERS,
-            timeout=10
-        )
-        print(f"  [STEP 1] Status: {search_resp.status_code}")
-
-        if search_resp.status_code != 200:
-            print(f"  [STEP 1] ❌ Failed - raw response: {search_resp.text[:200]}")
-            return jsonify({"error": f"FlavorDB search failed: {search_resp.status_code}"}), 500
-
-        search_data = search_resp.json()
-        entities = search_data.get("content", [])
-        print(f"  [STEP 1] ✅ Found {len(entities)} entity match(es):")
-        for e in entities:
-            print(f"           • {e.get('entity_alias_readable')} [{e.get('category_readable')}] alias={e.get('entity_alias')}")
-
-        if not entities:
-            print(f"  [STEP 1] ❌ No entities returned for '{allergen}'")
-            return jsonify({"error": f"No FlavorDB entity found for '{allergen}'"}), 404
-
-        # ── STEP 2: Find the dominant category ───────────────────────────────
-        print(f"\n  [STEP 2] Determining dominant category...")
-        categories = [e.get("category_readable", "") for e in entities if e.get("category_readable")]
-        category_counts = Counter(categories)
-        print(f"  [STEP 2] Category counts: {dict(category_counts)}")
-
-        if not categories:
-            return jsonify({"error": "No category data found"}), 404
-
-        dominant_category = category_counts.most_common(1)[0][0]
-        print(f"  [STEP 2] ✅ Dominant category: '{dominant_category}'")
-
-        # ── STEP 3: Pick the best entity alias to query ───────────────────────
-        print(f"\n  [STEP 3] Selecting best entity from dominant category '{dominant_category}'...")
-        best_entity = next(
-            (e for e in entities if e.get("category_readable") == dominant_category),
-            entities[0]
-        )
-        print(f"  [STEP 3] Best entity: {best_entity.get('entity_alias_readable')}")
-
-        # Prefer entity_alias_readable (properly capitalized) over raw alias slug
-        # The by-alias endpoint expects names like "Mango", "Peanut", "Orange"
-        alias_readable = best_entity.get("entity_alias_readable", "")
-        alias_slug = best_entity.get("entity_alias", "")
-        # Use readable name, capitalized — matches the API's expected format
-        alias = alias_readable.title() if alias_readable else alias_slug.title()
-        print(f"  [STEP 3] ✅ Using alias for pairing lookup: '{alias}'")
-
-        # ── STEP 4: Get molecularly similar foods via by-alias ────────────────
-        print(f"\n  [STEP 4] Fetching molecularly similar foods for '{alias}'...")
-        pairing_url = "https://api.foodoscope.com/flavordb/food/by-alias"
-        pairing_resp = requests.get(
-            pairing_url,
-            params={"food_pair": alias},
-            headers=API_HEADERS,
-            timeout=10
-        )
-        print(f"  [STEP 4] Status: {pairing_resp.status_code}")
-
-        if pairing_resp.status_code != 200:
-            print(f"  [STEP 4] ❌ Failed - raw response: {pairing_resp.text[:200]}")
-            return jsonify({"error": f"FlavorDB pairing failed: {pairing_resp.status_code}"}), 500
-
-        pairing_data = pairing_resp.json()
-        similar_entities = pairing_data.get("topSimilarEntities", [])
-        print(f"  [STEP 4] ✅ Found {len(similar_entities)} similar entities:")
-        for s in similar_entities[:5]:
-            print(f"           • {s.get('entityName')} [{s.get('category')}] — {s.get('similarMolecules')} shared molecules")
-        if len(similar_entities) > 5:
-            print(f"           ... and {len(similar_entities) - 5} more")
-
-        # ── STEP 5: Filter to same category, return top 3 ────────────────────
-        print(f"\n  [STEP 5] Filtering to dominant category '{dominant_category}'...")
-        same_cat = [
-            e for e in similar_entities
-            if e.get("category", "").lower().replace("-", " ") in dominant_category.lower()
-            or dominant_category.lower() in e.get("category", "").lower()
-        ]
-        print(f"  [STEP 5] Same-category matches: {len(same_cat)}")
-
-        # Use same-category if we have at least 2; otherwise fall back to top overall
-        if len(same_cat) >= 2:
-            top_substitutes = same_cat[:3]
-            print(f"  [STEP 5] ✅ Using {len(top_substitutes)} same-category substitutes")
-        else:
-            top_substitutes = similar_entities[:3]
-            print(f"  [STEP 5] ⚠️  Not enough same-category results, using top {len(top_substitutes)} overall")
-
-        for s in top_substitutes:
-            print(f"           → {s.get('entityName')} ({s.get('similarMolecules')} molecules)")
-
-        # ── BUILD RESPONSE ────────────────────────────────────────────────────
-        result = {
-            "allergen": allergen,
-            "matched_entity": best_entity.get("entity_alias_readable"),
-            "category": dominant_category,
-            "substitutes": [
-                {
-                    "name": s["entityName"],
-                    "category": s.get("category", ""),
-                    "similar_molecules": s.get("similarMolecules", 0),
-                    "wikipedia": s.get("wikipedia", ""),
-                    "description": (
-                        f"Shares {s.get('similarMolecules', 0)} flavor molecules with {allergen}. "
-                        f"A natural {s.get('category', 'food').lower()} substitute."
-                    )
-                }
-                for s in top_substitutes
-            ]
-        }
-
-        print(f"\n  ✅ DONE — returning {len(result['substitutes'])} substitutes for '{allergen}'")
-        print(f"{'─'*50}\n")
-        return jsonify(result)
-
+        result = substitutes.find_substitutes(allergen, API_HEADERS)
+    except substitutes.SubstituteError as e:
+        return jsonify({"error": str(e)}), e.status
     except Exception as e:
-        print(f"\n  ❌ UNHANDLED ERROR in allergen substitutes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unhandled error in allergen substitutes for %r", allergen)
         return jsonify({"error": str(e)}), 500
 
+    logger.info("Returning %d substitutes for %r", len(result["substitutes"]), allergen)
+    return jsonify(result)
 
-@app.route("/api/data", methods=["GET"])
-def get_data():
-    """Return UI static data (cuisines, allergens, etc.) - still from mock_data for UI."""
-    return jsonify({
+
+# --- Static UI Bundle ---
+# /api/data never changes while the process runs, so it is serialized and
+# gzipped once. Each representation gets its own strong ETag.
+STATIC_DATA_MAX_AGE = int(os.getenv("STATIC_DATA_MAX_AGE", "86400"))
+
+
+def _build_static_bundle() -> dict[str, tuple[bytes, str]]:
+    body = (app.json.dumps({
         "comfortCuisines": COMFORT_CUISINES,
         "targetCuisines": TARGET_CUISINES,
         "commonAllergens": COMMON_ALLERGENS,
@@ -197,7 +209,35 @@ def get_data():
         "initialUserProfile": INITIAL_USER_PROFILE,
         "initialSettings": INITIAL_SETTINGS,
         "restaurants": MOCK_RESTAURANTS,
-    })
+    }) + "\n").encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        "identity": (body, digest),
+        "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f"{digest}-gz"),
+    }
+
+
+STATIC_BUNDLE = _build_static_bundle()
+
+
+@app.route("/api/data", methods=["GET"])
+def get_data():
+    """Return UI static data (cuisines, allergens, etc.) - still from mock_data for UI."""
+    encoding = "gzip" if request.accept_encodings["gzip"] else "identity"
+    body, etag = STATIC_BUNDLE[encoding]
+
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype="application/json")
+        if encoding == "gzip":
+            response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={STATIC_DATA_MAX_AGE}"
+    response.headers["Vary"] = "Accept-Encoding"
+    if response.status_code == 200:
+        compression.record(request.url_rule.rule, len(STATIC_BUNDLE["identity"][0]), len(body))
+    return response
 
 
 @app.route("/api/recipe/search", methods=["POST"])
@@ -215,65 +255,87 @@ def search_recipes():
     if len(query) < 3:
         return jsonify({"error": "Query must be at least 3 characters"}), 400
     
-    print(f"\n🔍 RECIPE SEARCH REQUEST")
-    print(f"   Query: '{query}'")
+    logger.info("Recipe search: query=%r", query)
+
+    # Answer from the local title index when it covers the query
+    local = search_index.local_search(query, limit=20)
+    if local is not None:
+        count, recipes = local
+        logger.debug("Recipe search %r: %d local matches", query, count)
+        response = jsonify({
+            "success": True,
+            "query": query,
+            "count": count,
+            "recipes": recipes
+        })
+        response.headers["X-Search-Source"] = "local"
+        return response
     
     try:
         # Call Foodoscope API to search recipes by title
         url = f"{API_BASE_URL}/recipe-bytitle/recipeByTitle"
         params = {"title": query}
         
-        print(f"   API URL: {url}")
-        print(f"   Params: {params}")
-        
-        response = requests.get(url, params=params, headers=API_HEADERS, timeout=10)
-        
-        print(f"   Status: {response.status_code}")
+        response = upstream.get(url, params=params, headers=API_HEADERS)
         
         if response.status_code == 200:
             api_data = response.json()
             
             if api_data.get("success") and api_data.get("data"):
                 recipes = api_data["data"]
-                print(f"   ✅ Found {len(recipes)} recipes")
+                logger.debug("Recipe search %r: %d recipes", query, len(recipes))
+                search_index.record_upstream_answer(query, recipes)
                 
                 # Return top 20 results
-                return jsonify({
+                response = jsonify({
                     "success": True,
                     "query": query,
                     "count": len(recipes),
                     "recipes": recipes[:20]
                 })
             else:
-                print(f"   ❌ No recipes found")
-                return jsonify({
+                logger.debug("Recipe search %r: no recipes", query)
+                search_index.record_upstream_answer(query, [])
+                response = jsonify({
                     "success": True,
                     "query": query,
                     "count": 0,
                     "recipes": []
                 })
+            response.headers["X-Search-Source"] = "upstream"
+            return response
         else:
-            print(f"   ❌ API Error: {response.status_code}")
+            logger.warning("Recipe search failed: status=%s", response.status_code)
             return jsonify({"error": f"API returned status {response.status_code}"}), 500
             
     except Exception as e:
-        print(f"   ❌ ERROR: {e}")
+        logger.error("Recipe search error for %r: %s", query, e)
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/recipe/autocomplete", methods=["GET"])
+def autocomplete_titles():
+    """
+    Dish title typeahead from known titles (no upstream call).
+    Query: q (prefix, matched at any word start), limit (default 10, max 20)
+    """
+    prefix = request.args.get("q", "")
+    limit = request.args.get("limit", 10, type=int)
+    return jsonify({
+        "query": prefix,
+        "completions": AUTOCOMPLETE.complete(prefix, limit=limit),
+    })
+
+
 @app.route("/api/recipe/details/<recipe_id>", methods=["GET"])
 def get_recipe_details(recipe_id):
     """
     Get full recipe details including instructions.
     """
-    print(f"\n📖 RECIPE DETAILS REQUEST")
-    print(f"   Recipe ID: {recipe_id}")
-    
     try:
         # Fetch instructions
         instructions = fetch_recipe_instructions(recipe_id)
-        
-        print(f"   ✅ Found {len(instructions)} instruction steps")
+        logger.debug("Recipe details %r: %d instruction steps", recipe_id, len(instructions))
         
         return jsonify({
             "success": True,
@@ -282,7 +344,7 @@ def get_recipe_details(recipe_id):
         })
         
     except Exception as e:
-        print(f"   ❌ ERROR: {e}")
+        logger.error("Recipe details error for %r: %s", recipe_id, e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -320,62 +382,199 @@ def get_recipes_by_region(region):
     })
 
 
+def _parse_recommend_request(data: dict) -> tuple[dict | None, str | None]:
+    """Validate one recommendation request body. Returns (params, None) or (None, error)."""
+    if not isinstance(data, dict):
+        return None, "request must be an object"
+    source = str(data.get("comfortDish", "")).strip()
+    target = str(data.get("targetCuisine", "")).strip()
+    excluded = data.get("excludedAllergens", [])
+    top_k = data.get("topK")
+
+    if not source or not target:
+        return None, "comfortDish (source recipe) and targetCuisine are required"
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+        return None, "topK must be a positive integer"
+    if not isinstance(excluded, list):
+        return None, "excludedAllergens must be a list"
+    return {
+        "source": source,
+        "target": target,
+        "excluded": [_normalize_text(a) for a in excluded],
+        "top_k": top_k,
+    }, None
+
+
 @app.route("/api/recommend", methods=["POST"])
 def recommend():
     """Main recommendation endpoint - uses real API data."""
-    data = request.get_json() or {}
-    source = data.get("comfortDish", "").strip()
-    target = data.get("targetCuisine", "").strip()
-    excluded = data.get("excludedAllergens", [])
+    params, error = _parse_recommend_request(request.get_json() or {})
+    if error:
+        return jsonify({"error": error}), 400
+    source, target, excluded, top_k = params["source"], params["target"], params["excluded"], params["top_k"]
+
+    AUTOCOMPLETE.record_use(source)
+    key = _result_cache_key(source, target, excluded, top_k)
+    # A profiled request always runs the pipeline, so skip the result cache lookup
+    profile = profiling.requested(request.headers.get("X-Profile"), request.args.get("profile"))
+    body = None if profile else _cached_result(key)
+    if body is not None:
+        response = app.response_class(body, mimetype="application/json")
+        response.headers["X-Cache"] = "HIT"
+        return response
 
-    if not source or not target:
-        return jsonify({"error": "comfortDish (source recipe) and targetCuisine are required"}), 400
-
-    print(f"\n\n")
-    print(f"╔{'═'*78}╗")
-    print(f"║{' '*78}║")
-    print(f"║{'  NEW RECOMMENDATION REQUEST':^78}║")
-    print(f"║{' '*78}║")
-    print(f"╚{'═'*78}╝")
-    print(f"")
-    print(f"  🍽️  Comfort Dish: {source}")
-    print(f"  🌍 Target Cuisine: {target}")
-    print(f"  🚫 Excluded Allergens: {excluded if excluded else 'None'}")
-    print(f"")
-    
     try:
-        results = recommend_recipes(
-            source_recipe_title=source,
-            target_cuisine=target,
-            excluded_allergens=excluded,
-        )
+        report = None
+        if profile:
+            results, report = profiling.profile_call(
+                f"recommend {source} -> {target}", recommend_recipes,
+                source_recipe_title=source, target_cuisine=target, excluded_allergens=excluded, top_k=top_k,
+            )
+        else:
+            results = recommend_recipes(
+                source_recipe_title=source,
+                target_cuisine=target,
+                excluded_allergens=excluded,
+                top_k=top_k,
+            )
         
-        print(f"\n{'─'*80}")
-        print(f"📤 FINAL RESULTS TO SEND TO FRONTEND")
-        print(f"{'─'*80}")
-        print(f"Total Recommendations: {len(results)}")
-        print(f"")
-        for i, r in enumerate(results, 1):
-            print(f"  {i}. {r.get('recipe_title')}")
-            print(f"     Score: {r.get('final_score'):.3f}")
-            print(f"     Explanation: {r.get('explanation', ['No explanation'])[0][:60]}...")
-        print(f"{'─'*80}\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending %d results: %s", len(results),
+                         [(r.get("recipe_title"), r.get("final_score")) for r in results])
         
-        return jsonify(results)
+        response = jsonify(results)
+        # Fallback answers ("no recipes found ...") echo the raw inputs and are transient; don't share them
+        if not any(r.get("no_match_fallback") for r in results):
+            _store_result(key, response.get_data(), source, target)
+        response.headers["X-Cache"] = "MISS"
+        if report:
+            response.headers["X-Profile-Report"] = report
+        return response
         
     except Exception as e:
-        print(f"\n❌ ERROR in recommendation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in recommendation for %r -> %r", source, target)
         return jsonify({"error": str(e)}), 500
 
 
+def _sse_event(event: str, payload) -> str:
+    # One line of compact JSON per event (SSE data lines can't contain newlines)
+    return f"event: {event}\ndata: {app.json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+@app.route("/api/recommend/stream", methods=["GET"])
+def recommend_stream():
+    """
+    /api/recommend as Server-Sent Events (GET so EventSource can use it).
+    Query: comfortDish, targetCuisine, excludedAllergens (comma-separated), topK
+    Events: source_profile, candidates, provisional, final - or a single
+    final on a result-cache hit, and error if the pipeline fails.
+    """
+    excluded_arg = request.args.get("excludedAllergens", "")
+    params, error = _parse_recommend_request({
+        "comfortDish": request.args.get("comfortDish", ""),
+        "targetCuisine": request.args.get("targetCuisine", ""),
+        "excludedAllergens": [a for a in excluded_arg.split(",") if a.strip()],
+        "topK": request.args.get("topK", type=int),
+    })
+    if error:
+        return jsonify({"error": error}), 400
+    source, target, excluded, top_k = params["source"], params["target"], params["excluded"], params["top_k"]
+    AUTOCOMPLETE.record_use(source)
+    key = _result_cache_key(source, target, excluded, top_k)
+
+    def events():
+        body = _cached_result(key)
+        if body is not None:
+            yield _sse_event("final", json.loads(body))
+            return
+        try:
+            for stage, payload in recommend_recipes_stages(source, target, excluded, top_k):
+                if stage == "final" and not any(r.get("no_match_fallback") for r in payload):
+                    _store_result(key, jsonify(payload).get_data(), source, target)
+                yield _sse_event(stage, payload)
+        except Exception as e:
+            logger.exception("Error in streaming recommendation for %r -> %r", source, target)
+            yield _sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch():
+    """
+    Recommendations for many (comfortDish, targetCuisine) pairs in one call.
+    Body: { "requests": [{ "comfortDish", "targetCuisine", "excludedAllergens"?, "topK"? }, ...] }
+    Returns { "results": [...] } in input order; each item is
+    { "recommendations": [...] } or { "error": "...", "status": 400|500 }.
+    """
+    data = request.get_json() or {}
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"at most {BATCH_MAX_ITEMS} requests per batch"}), 400
+
+    out: list[dict | None] = [None] * len(items)
+    pending = []  # (index, params, result cache key)
+    cache_hits = 0
+    for i, item in enumerate(items):
+        params, error = _parse_recommend_request(item)
+        if error:
+            out[i] = {"error": error, "status": 400}
+            continue
+        key = _result_cache_key(params["source"], params["target"], params["excluded"], params["top_k"])
+        body = _cached_result(key)
+        if body is not None:
+            out[i] = {"recommendations": json.loads(body)}
+            cache_hits += 1
+        else:
+            pending.append((i, params, key))
+
+    if pending:
+        batch_results = recommend_recipes_batch([params for _, params, _ in pending])
+        for (i, params, key), results in zip(pending, batch_results):
+            if isinstance(results, Exception):
+                out[i] = {"error": str(results), "status": 500}
+                continue
+            out[i] = {"recommendations": results}
+            if not any(r.get("no_match_fallback") for r in results):
+                _store_result(key, jsonify(results).get_data(), params["source"], params["target"])
+
+    logger.info("Batch of %d: %d from result cache, %d computed", len(items), cache_hits, len(pending))
+    return jsonify({"results": out})
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
     """Health check endpoint."""
     return jsonify({"status": "ok", "service": "FlavorBridge API with Real Data"})
 
 
+@app.route("/api/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Stage/upstream latency histograms, HTTP, cache and candidate counters in Prometheus text format."""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/api/stats", methods=["GET"])
+def stats():
+    """Upstream connection pool stats, response cache, single-flight and compression counters."""
+    return jsonify({
+        "upstream": upstream.pool_stats(),
+        "caches": cache.all_stats(),
+        "singleflight": singleflight.all_stats(),
+        "substitute_table": substitutes.stats()["table"],
+        "search_index": search_index.stats(),
+        "autocomplete": AUTOCOMPLETE.stats(),
+        "compression": compression.stats(),
+        "json_backend": app.json.backend,
+    })
+
+
 if __name__ == "__main__":
     print("\n")
     print("╔═══════════════════════════════════════════════════════════════════════════════╗")
@@ -390,11 +589,18 @@ if __name__ == "__main__":
     print("  🌐 Server: http://localhost:5000")
     print("  📡 CORS enabled for: http://localhost:3000")
     print("")
+    print(f"  🥜 Substitute table: {substitutes.SUBSTITUTE_TABLE_PATH or 'not persisted'} (loaded on first request)")
+    print("")
     print("  Available Endpoints:")
     print("    • GET  /api/health")
+    print("    • GET  /api/stats")
+    print("    • GET  /api/metrics")
     print("    • GET  /api/data")
     print("    • POST /api/recommend")
+    print("    • POST /api/recommend/batch")
+    print("    • GET  /api/recommend/stream")
     print("    • POST /api/recipe/search")
+    print("    • GET  /api/recipe/autocomplete?q=<prefix>")
     print("    • GET  /api/recipe/details/<recipe_id>")
     print("    • GET  /api/recipe/<title>")
     print("    • GET  /api/recipes/region/<region>")
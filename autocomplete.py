@@ -0,0 +1,157 @@
+"""
+Typeahead over known dish titles.
+Every title is stored under its normalized form and under each later word
+start ("chicken tikka masala", "tikka masala", "masala"), in one sorted
+array. A prefix is a bisect range of that array; completions in the range
+are ranked by popularity (times the title was seen upstream or asked for).
+"""
+
+from __future__ import annotations
+import bisect
+import re
+import threading
+from typing import Any, Iterable
+
+_TOKEN_RE = re.compile(r"\w+")
+
+AUTOCOMPLETE_MAX_RESULTS = 20
+_SMALL_RANGE = 64  # Wider prefix ranges (short prefixes) keep their ranking cached
+_MAX_CACHED_PREFIXES = 512
+
+
+def normalize_title(text: str) -> str:
+    """Lowercased word tokens joined by single spaces."""
+    return " ".join(_TOKEN_RE.findall(str(text).lower()))
+
+
+class Autocomplete:
+    """
+    Thread-safe sorted-array autocomplete.
+
+    Args:
+        max_titles: New titles beyond this many are ignored (known ones still gain popularity)
+    """
+
+    def __init__(self, max_titles: int = 100_000):
+        self.max_titles = max_titles
+        self._lock = threading.Lock()
+        self._keys: list[str] = []  # Sorted entry keys (title or title suffix at a word start)
+        self._key_title: list[int] = []  # Parallel to _keys: index into _titles
+        self._titles: list[str] = []  # Display form, first spelling seen
+        self._norms: list[str] = []
+        self._popularity: list[int] = []
+        self._by_norm: dict[str, int] = {}
+        # (prefix, limit) -> ranked title indexes, for wide ranges only. Popularity
+        # only grows, so a bumped or new title is merged in instead of re-ranking the range.
+        self._top_cache: dict[tuple[str, int], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add_titles(self, titles: Iterable[str], weight: int = 1) -> int:
+        """Add titles (or bump known ones by weight). Returns how many were new."""
+        touched: list[int] = []
+        new_entries: list[tuple[str, int]] = []
+        with self._lock:
+            for title in titles:
+                norm = normalize_title(title) if title else ""
+                if not norm:
+                    continue
+                index = self._by_norm.get(norm)
+                if index is not None:
+                    self._popularity[index] += weight
+                    touched.append(index)
+                    continue
+                if len(self._titles) >= self.max_titles:
+                    continue
+                index = len(self._titles)
+                self._titles.append(str(title).strip())
+                self._norms.append(norm)
+                self._popularity.append(weight)
+                self._by_norm[norm] = index
+                new_entries.extend((key, index) for key in _word_suffixes(norm))
+                touched.append(index)
+
+            if len(new_entries) > 64:  # Bulk load: one merge-sort instead of many O(n) inserts
+                merged = sorted(zip(self._keys + [k for k, _ in new_entries], self._key_title + [i for _, i in new_entries]))
+                self._keys = [k for k, _ in merged]
+                self._key_title = [i for _, i in merged]
+            else:
+                for key, index in new_entries:
+                    pos = bisect.bisect_right(self._keys, key)
+                    self._keys.insert(pos, key)
+                    self._key_title.insert(pos, index)
+            for index in dict.fromkeys(touched):
+                self._merge_into_cache(index)
+        return len({i for _, i in new_entries})
+
+    def add_recipes(self, recipes: list[dict]) -> None:
+        """Recipe observer: count every Recipe_title in an upstream response."""
+        self.add_titles(r.get("Recipe_title", "") for r in recipes if isinstance(r, dict))
+
+    def record_use(self, title: str) -> bool:
+        """Bump a known title that a user picked. Unknown titles are not added. Returns True if known."""
+        with self._lock:
+            index = self._by_norm.get(normalize_title(title))
+            if index is None:
+                return False
+            self._popularity[index] += 1
+            self._merge_into_cache(index)
+            return True
+
+    def _rank(self, index: int, prefix: str) -> tuple:
+        # Most popular first; ties: whole-title prefix matches, shorter titles, then alphabetical
+        return (-self._popularity[index], not self._norms[index].startswith(prefix),
+                len(self._titles[index]), self._titles[index])
+
+    def _merge_into_cache(self, index: int) -> None:
+        suffixes = _word_suffixes(self._norms[index])
+        for (prefix, limit), top in self._top_cache.items():
+            if index not in top:
+                if not any(s.startswith(prefix) for s in suffixes):
+                    continue
+                top.append(index)
+            top.sort(key=lambda i: self._rank(i, prefix))
+            del top[limit:]
+
+    def complete(self, prefix: str, limit: int = 10) -> list[dict[str, Any]]:
+        """
+        Top completions for prefix, most popular first (ties: title-start matches, then shorter titles).
+
+        Args:
+            prefix: What the user has typed so far
+            limit: Maximum completions (capped at AUTOCOMPLETE_MAX_RESULTS)
+
+        Returns:
+            [{"title", "popularity"}, ...]
+        """
+        norm = normalize_title(prefix)
+        if not norm:
+            return []
+        # A trailing space means the last word is complete
+        if prefix[-1:].isspace():
+            norm += " "
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_RESULTS))
+        with self._lock:
+            top = self._top_cache.get((norm, limit))
+            if top is None:
+                lo = bisect.bisect_left(self._keys, norm)
+                hi = bisect.bisect_left(self._keys, norm + "\U0010ffff", lo)
+                candidates = dict.fromkeys(self._key_title[lo:hi])
+                top = sorted(candidates, key=lambda i: self._rank(i, norm))[:limit]
+                if hi - lo > _SMALL_RANGE:
+                    if len(self._top_cache) >= _MAX_CACHED_PREFIXES:
+                        self._top_cache.clear()
+                    self._top_cache[(norm, limit)] = top
+            return [{"title": self._titles[i], "popularity": self._popularity[i]} for i in top]
+
+    def stats(self) -> dict[str, Any]:
+        return {"titles": len(self._titles), "entries": len(self._keys), "cached_prefixes": len(self._top_cache)}
+
+
+def _word_suffixes(norm: str) -> list[str]:
+    words = norm.split(" ")
+    return [" ".join(words[start:]) for start in range(len(words))]
+
+
+AUTOCOMPLETE = Autocomplete()
@@ -0,0 +1,257 @@
+"""
+Vectorized batch scoring - score one source profile against N candidates.
+Same weights and formulas as flavor_bridge.score_recipe, but flavor and
+texture vectors are packed into fixed-axis float matrices and extracted
+ingredients into uint64 bitsets, so a whole candidate pool is scored in a
+handful of NumPy ops.
+
+flavor_bridge ranks candidate pools of BATCH_SCORING_MIN_CANDIDATES or more
+through score_batch. Packing costs about as much as scoring in Python once,
+so packed batches are memoized per candidate list (region lists are cached
+objects, so a repeat cuisine reuses its batch).
+
+This module doesn't import flavor_bridge: the keyword tables it packs against
+(texture axes, food pairing) are passed in by the caller.
+"""
+
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from flavor_bridge import RecipeProfile
+
+# --- Fixed Axes ---
+FLAVOR_AXES = ("savory", "aromatic", "fresh", "bold", "comfort")  # Every key _infer_flavor_style can emit
+
+BATCH_SCORING_MIN_CANDIDATES = int(os.getenv("BATCH_SCORING_MIN_CANDIDATES", "32"))  # Below this the Python loop is faster
+_BATCH_MEMO_SIZE = 32
+
+# Same weights as score_recipe
+METHOD_W, FLAVOR_W, INGREDIENT_W, PROTEIN_W, PAIRING_W = 0.30, 0.25, 0.25, 0.10, 0.10
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(a: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(a).astype(np.float64)
+else:  # NumPy < 2.0
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(a: np.ndarray) -> np.ndarray:
+        return _BYTE_POPCOUNT[a.reshape(-1, 1).view(np.uint8)].sum(axis=1).astype(np.float64)
+
+
+def _vector(mapping, axes: tuple[str, ...]) -> list[float]:
+    return [float(mapping.get(axis, 0.0)) for axis in axes]
+
+
+@dataclass(frozen=True)
+class CandidateBatch:
+    """Packed feature arrays for N target profiles. Build once, score against any source."""
+    profiles: tuple[RecipeProfile, ...]
+    texture_axes: tuple[str, ...]
+    methods: tuple[str, ...]
+    method_codes: np.ndarray  # (N,) int index into methods
+    proteins: tuple[str, ...]
+    protein_codes: np.ndarray  # (N,) int index into proteins
+    flavor: np.ndarray  # (N, len(FLAVOR_AXES))
+    flavor_norm: np.ndarray  # (N,)
+    texture: np.ndarray  # (N, len(texture_axes))
+    texture_norm: np.ndarray  # (N,)
+    ingredients: np.ndarray  # (N,) uint64 bitsets
+    ingredient_counts: np.ndarray  # (N,)
+    comfort: np.ndarray  # (N,)
+    technique: np.ndarray  # (N,) adaptability technique term, already weighted
+    chicken_pairing: np.ndarray  # (N,) _pairing_overlap("chicken", ...) per target
+
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[RecipeProfile], texture_axes: Sequence[str],
+                      chicken_pairing: Callable[[Sequence[str]], float]) -> "CandidateBatch":
+        """
+        Args:
+            profiles: Target profiles, in candidate order
+            texture_axes: Every texture a profile can carry (flavor_bridge.TEXTURE_KEYWORDS)
+            chicken_pairing: Food-pairing overlap of a chicken source with a target's extracted ingredients
+        """
+        profiles = tuple(profiles)
+        texture_axes = tuple(texture_axes)
+        methods = tuple(dict.fromkeys(p.method for p in profiles))
+        method_index = {m: i for i, m in enumerate(methods)}
+        proteins = tuple(dict.fromkeys(p.protein for p in profiles))
+        protein_index = {p: i for i, p in enumerate(proteins)}
+
+        flavor = np.array([_vector(p.flavor_vector, FLAVOR_AXES) for p in profiles], dtype=np.float64).reshape(-1, len(FLAVOR_AXES))
+        texture = np.array([_vector(p.texture_profile, texture_axes) for p in profiles], dtype=np.float64).reshape(-1, len(texture_axes))
+        ingredients = np.array([p.ingredient_mask for p in profiles], dtype=np.uint64)
+
+        technique = []
+        for p in profiles:
+            if p.common_techniques > 0:
+                technique.append(0.2 * (p.common_techniques / (p.common_techniques + p.complex_techniques + 1)))
+            else:
+                technique.append(0.1)
+
+        return cls(
+            profiles=profiles,
+            texture_axes=texture_axes,
+            methods=methods,
+            method_codes=np.array([method_index[p.method] for p in profiles], dtype=np.int64),
+            proteins=proteins,
+            protein_codes=np.array([protein_index[p.protein] for p in profiles], dtype=np.int64),
+            flavor=flavor,
+            flavor_norm=np.sqrt((flavor * flavor).sum(axis=1)),
+            texture=texture,
+            texture_norm=np.sqrt((texture * texture).sum(axis=1)),
+            ingredients=ingredients,
+            ingredient_counts=_popcount(ingredients),
+            comfort=np.array([p.comfort_level for p in profiles], dtype=np.float64),
+            technique=np.array(technique, dtype=np.float64),
+            chicken_pairing=np.array([chicken_pairing(p.ingredients_extracted) for p in profiles], dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+
+@dataclass(frozen=True)
+class BatchScores:
+    """Per-candidate score arrays (all (N,), fractions 0-1 like score_recipe's internals)."""
+    final_score: np.ndarray
+    comfort_similarity: np.ndarray
+    flavor_similarity: np.ndarray
+    adaptability: np.ndarray
+    texture_alignment: np.ndarray
+    ingredient_match: np.ndarray
+
+    def similarity_metrics(self, i: int) -> dict[str, float]:
+        """score_recipe-style detailed_metrics (percentages, 1 decimal) for candidate i."""
+        return {
+            "comfort_similarity": round(float(self.comfort_similarity[i]) * 100, 1),
+            "flavor_similarity": round(float(self.flavor_similarity[i]) * 100, 1),
+            "adaptability": round(float(self.adaptability[i]) * 100, 1),
+            "texture_alignment": round(float(self.texture_alignment[i]) * 100, 1),
+            "ingredient_match": round(float(self.ingredient_match[i]) * 100, 1),
+        }
+
+
+def _cosine(matrix: np.ndarray, norms: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """Cosine of each row against vector; 0.5 where either side is all-zero (empty)."""
+    denom = norms * float(np.sqrt(vector @ vector))
+    dot = matrix @ vector
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom == 0, 0.5, dot / np.where(denom == 0, 1.0, denom))
+
+
+def score_batch(source: RecipeProfile, batch: CandidateBatch) -> BatchScores:
+    """Score source against every candidate in batch. Matches score_recipe within float tolerance."""
+    n = len(batch)
+    if n == 0:
+        empty = np.zeros(0)
+        return BatchScores(empty, empty, empty, empty, empty, empty)
+
+    # 1. Cooking method
+    src_method_code = next((i for i, m in enumerate(batch.methods) if m == source.method), -1)
+    same_method = batch.method_codes == src_method_code
+    method_ok = same_method if source.method else np.zeros(n, dtype=bool)
+
+    # 2. Flavor (cosine, clipped to [0, 1])
+    flavor_sim = np.clip(_cosine(batch.flavor, batch.flavor_norm, np.array(_vector(source.flavor_vector, FLAVOR_AXES))), 0.0, 1.0)
+
+    # 3. Ingredients (Jaccard over bitsets)
+    src_mask = np.uint64(source.ingredient_mask)
+    inter = _popcount(batch.ingredients & src_mask)
+    union = _popcount(batch.ingredients | src_mask)
+    if source.ingredients_extracted:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ingredient_sim = np.where((batch.ingredient_counts == 0) | (union == 0), 0.0, inter / np.where(union == 0, 1.0, union))
+    else:
+        ingredient_sim = np.zeros(n)
+
+    # 4. Protein
+    src_protein_code = next((i for i, p in enumerate(batch.proteins) if p == source.protein), -1)
+    same_protein = batch.protein_codes == src_protein_code
+    protein_ok = same_protein if source.protein else np.zeros(n, dtype=bool)
+
+    # 5. Food pairing
+    pairing = batch.chicken_pairing if source.protein == "chicken" else np.full(n, 0.5)
+
+    final = (METHOD_W * method_ok + FLAVOR_W * flavor_sim + INGREDIENT_W * ingredient_sim
+             + PROTEIN_W * protein_ok + PAIRING_W * pairing)
+
+    # Detailed metrics
+    comfort_sim = 1.0 - np.abs(source.comfort_level - batch.comfort)
+    texture_sim = _cosine(batch.texture, batch.texture_norm, np.array(_vector(source.texture_profile, batch.texture_axes)))
+
+    target_has_protein = np.array([bool(p) for p in batch.proteins], dtype=bool)[batch.protein_codes]
+    if source.protein:
+        protein_term = np.where(same_protein, 0.1, np.where(target_has_protein, 0.0, 0.05))
+    else:
+        protein_term = np.full(n, 0.05)
+    adaptability = np.minimum(1.0, 0.4 * same_method + 0.3 * ingredient_sim + batch.technique + protein_term)
+
+    return BatchScores(
+        final_score=final,
+        comfort_similarity=comfort_sim,
+        flavor_similarity=flavor_sim,
+        adaptability=adaptability,
+        texture_alignment=texture_sim,
+        ingredient_match=ingredient_sim,
+    )
+
+
+def score_recipes_batch(source: RecipeProfile, batch: CandidateBatch) -> list[tuple[float, dict]]:
+    """Convenience wrapper: [(final_score, similarity_metrics), ...] in candidate order."""
+    scores = score_batch(source, batch)
+    return [(float(scores.final_score[i]), scores.similarity_metrics(i)) for i in range(len(scores.final_score))]
+
+
+# id(candidate list) -> (the list, its batch). Holding the list keeps its id from being reused.
+_batches: "OrderedDict[int, tuple[list[dict], CandidateBatch]]" = OrderedDict()
+_batches_lock = threading.Lock()
+
+
+def batch_for(recipes: list[dict], pack: Callable[[list[dict]], CandidateBatch]) -> CandidateBatch:
+    """
+    Packed batch for a candidate list, memoized by list identity.
+
+    Args:
+        recipes: Candidate recipes (e.g. a cached fetch_recipes_by_region result); must not be mutated
+        pack: Builds the batch for recipes on a memo miss
+    """
+    with _batches_lock:
+        entry = _batches.get(id(recipes))
+        if entry is not None and entry[0] is recipes:
+            _batches.move_to_end(id(recipes))
+            return entry[1]
+    batch = pack(recipes)
+    with _batches_lock:
+        _batches[id(recipes)] = (recipes, batch)
+        while len(_batches) > _BATCH_MEMO_SIZE:
+            _batches.popitem(last=False)
+    return batch
+
+
+def top_candidates(source: RecipeProfile, batch: CandidateBatch, excluded_mask: int,
+                   top_k: int) -> tuple[list[tuple[float, int]], int]:
+    """
+    Best top_k candidates by final score, ties in candidate order (like heapq.nlargest).
+
+    Args:
+        excluded_mask: Title-ingredient bitset (flavor_bridge.excluded_title_ingredient_mask); matching candidates are skipped
+
+    Returns:
+        ([(score, index), ...] best first, number of candidates scored)
+    """
+    scores = score_batch(source, batch).final_score
+    if excluded_mask:
+        keep = np.fromiter((not p.title_ingredient_mask & excluded_mask for p in batch.profiles),
+                           dtype=bool, count=len(batch))
+        indexes = np.flatnonzero(keep)
+    else:
+        indexes = np.arange(len(batch))
+    order = indexes[np.argsort(-scores[indexes], kind="stable")[:top_k]]
+    return [(float(scores[i]), int(i)) for i in order], len(indexes)
@@ -0,0 +1,263 @@
+"""
+Benchmarks for the recommendation pipeline and its scoring kernels.
+
+Micro: extract_ingredients_from_instructions, detect_texture_profile,
+score_recipe and contains_allergen on synthetic recipes of several step
+counts. "cold" clears the keyword-scan memo before every call; "warm" lets it hit.
+Ranking a candidate pool one match_score at a time ("loop") against
+batch_scoring ("pack" builds the arrays, "batch" scores a packed pool).
+Macro: recommend_recipes end to end against foodoscope_stub with
+10/100/1000/10000 region candidates. "cold" starts from empty upstream and
+profile caches; "warm" repeats the same request.
+
+Run:      python benchmarks/bench_pipeline.py --output bench.json
+Compare:  python benchmarks/bench_pipeline.py --compare bench.json
+"""
+
+from __future__ import annotations
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+import batch_scoring  # noqa: E402
+import flavor_bridge as fb  # noqa: E402
+import foodoscope_stub  # noqa: E402
+
+STEP_COUNTS = (1, 8, 32, 128)
+CANDIDATE_COUNTS = (10, 100, 1000, 10000)
+MACRO_SOURCE = "Judy's Hearty Vegetable Minestrone Soup"  # Mock recipe with real instructions (I001)
+MACRO_REGION = "Italian"
+
+
+# --- Timing ---
+
+def measure(fn: Callable[[], Any], min_time: float, min_runs: int = 5, max_runs: int = 100_000) -> dict[str, Any]:
+    """
+    Time fn repeatedly. Fast functions run in batches so timer overhead stays
+    negligible; each sample is a batch average.
+
+    Returns:
+        {"runs", "median_us", "mean_us", "p95_us", "min_us"}
+    """
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= 50_000 or number >= 10_000:
+            break
+        number *= 10
+
+    samples = [elapsed / number]
+    deadline = time.perf_counter() + min_time
+    while (len(samples) < min_runs or time.perf_counter() < deadline) and len(samples) * number < max_runs:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / number)
+
+    samples.sort()
+    return {
+        "runs": len(samples) * number,
+        "median_us": round(statistics.median(samples) / 1000, 3),
+        "mean_us": round(statistics.fmean(samples) / 1000, 3),
+        "p95_us": round(samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)] / 1000, 3),
+        "min_us": round(samples[0] / 1000, 3),
+    }
+
+
+# --- Synthetic Recipes ---
+
+def synthetic_recipe(steps: int, rng: random.Random) -> tuple[str, list[str]]:
+    """(title, instructions) using the vocabulary the detectors look for, plus filler words."""
+    methods = [kw for kws in fb.METHOD_KEYWORDS.values() for kw in kws]
+    textures = [kw for kws in fb.TEXTURE_KEYWORDS.values() for kw in kws]
+    ingredients = fb.COMMON_INGREDIENTS_LOWER
+    filler = ["the", "until", "gently", "minutes", "over", "medium", "pan", "bowl", "then", "and"]
+    title = f"{rng.choice(['spicy', 'creamy', 'hearty'])} {rng.choice(['chicken', 'lentil', 'beef', 'vegetable'])} {rng.choice(['curry', 'stew', 'soup'])}"
+    instructions = [
+        " ".join([rng.choice(methods), rng.choice(ingredients), *rng.sample(filler, 4), rng.choice(textures)])
+        for _ in range(steps)
+    ]
+    return title.title(), instructions
+
+
+def micro_benchmarks(min_time: float) -> list[dict[str, Any]]:
+    rng = random.Random(7)
+    results = []
+    for steps in STEP_COUNTS:
+        title, instructions = synthetic_recipe(steps, rng)
+        other_title, other_instructions = synthetic_recipe(steps, rng)
+        ingredients = fb.extract_ingredients_from_instructions(instructions)
+        source = fb.build_recipe_profile(title, instructions, f"bench-src-{steps}")
+        target = fb.build_recipe_profile(other_title, other_instructions, f"bench-tgt-{steps}")
+        excluded = ["dairy", "nuts"]
+        clear = fb._keyword_hits.cache_clear
+
+        def extract_cold():
+            clear()
+            fb.extract_ingredients_from_instructions(instructions)
+
+        def texture_cold():
+            clear()
+            fb.detect_texture_profile(title, instructions, ingredients)
+
+        cases = {
+            "extract_ingredients.cold": extract_cold,
+            "extract_ingredients.warm": lambda: fb.extract_ingredients_from_instructions(instructions),
+            "detect_texture_profile.cold": texture_cold,
+            "detect_texture_profile.warm": lambda: fb.detect_texture_profile(title, instructions, ingredients),
+            "score_recipe": lambda: fb.score_recipe(source, target),
+            "contains_allergen": lambda: fb.contains_allergen(ingredients, excluded),
+        }
+        for name, fn in cases.items():
+            results.append({"name": f"micro.{name}", "params": {"steps": steps}, **measure(fn, min_time)})
+    return results
+
+
+def ranking_benchmarks(counts: tuple[int, ...], min_time: float) -> list[dict[str, Any]]:
+    rng = random.Random(13)
+    source = fb.build_recipe_profile(*synthetic_recipe(8, rng), "bench-rank-src")
+    pool = [fb.build_recipe_profile(*synthetic_recipe(8, rng), f"bench-rank-{i}") for i in range(max(counts))]
+    results = []
+    for count in counts:
+        profiles = pool[:count]
+        batch = fb.pack_candidates(profiles)
+        cases = {
+            "rank.loop": lambda: heapq.nlargest(fb.DEFAULT_TOP_K, (fb.match_score(source, p) for p in profiles)),
+            "rank.pack": lambda: fb.pack_candidates(profiles),
+            "rank.batch": lambda: batch_scoring.top_candidates(source, batch, 0, fb.DEFAULT_TOP_K),
+        }
+        for name, fn in cases.items():
+            results.append({"name": f"micro.{name}", "params": {"candidates": count},
+                            **measure(fn, min_time, max_runs=20_000)})
+    return results
+
+
+# --- Macro ---
+
+def _clear_pipeline_caches() -> None:
+    for c in (fb.RECIPE_CACHE, fb.INSTRUCTIONS_CACHE, fb.REGION_CACHE, fb.PROFILE_CACHE):
+        c.clear()
+    fb._keyword_hits.cache_clear()
+
+
+def macro_benchmarks(counts: tuple[int, ...], min_time: float) -> list[dict[str, Any]]:
+    # The stub only returns vegan recipes for the default diet (80% of synthetic ones); leave headroom
+    stub_config = foodoscope_stub.StubConfig(
+        synthetic_recipes=int(max(counts) * 1.4), synthetic_regions=(MACRO_REGION,), seed=11,
+    )
+    server, root = foodoscope_stub.start(stub_config)
+    saved_base, saved_limit = fb.API_BASE_URL, fb.CANDIDATE_LIMIT
+    fb.API_BASE_URL = f"{root}{foodoscope_stub.RECIPE_PREFIX}"
+    results = []
+    try:
+        for count in counts:
+            fb.CANDIDATE_LIMIT = count
+            _clear_pipeline_caches()
+            scored = len(fb.recommend_recipes(MACRO_SOURCE, MACRO_REGION, top_k=fb.MAX_TOP_K))
+            candidates = len(fb.fetch_recipes_by_region(MACRO_REGION, limit=count))
+
+            def cold():
+                _clear_pipeline_caches()
+                fb.recommend_recipes(MACRO_SOURCE, MACRO_REGION)
+
+            params = {"candidates": candidates, "returned": scored}
+            results.append({"name": "macro.recommend_recipes.cold", "params": params,
+                            **measure(cold, min_time, min_runs=3, max_runs=50)})
+            results.append({"name": "macro.recommend_recipes.warm", "params": params,
+                            **measure(lambda: fb.recommend_recipes(MACRO_SOURCE, MACRO_REGION), min_time, min_runs=3, max_runs=500)})
+    finally:
+        fb.API_BASE_URL, fb.CANDIDATE_LIMIT = saved_base, saved_limit
+        server.shutdown()
+    return results
+
+
+# --- Reporting ---
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def result_key(result: dict[str, Any]) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()) if k != "returned")
+    return f"{result['name']}[{params}]"
+
+
+def print_table(results: list[dict[str, Any]], baseline: dict[str, dict] | None = None) -> None:
+    header = f"{'benchmark':<58} {'median_us':>12} {'p95_us':>12} {'runs':>8}"
+    print(header + ("  vs baseline" if baseline else ""))
+    print("-" * (len(header) + (13 if baseline else 0)))
+    for result in results:
+        key = result_key(result)
+        line = f"{key:<58} {result['median_us']:>12.3f} {result['p95_us']:>12.3f} {result['runs']:>8}"
+        if baseline and key in baseline and baseline[key]["median_us"]:
+            change = (result["median_us"] / baseline[key]["median_us"] - 1) * 100
+            line += f"  {change:+7.1f}%"
+        print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the FlavorBridge pipeline and scoring kernels.")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output run; prints median change")
+    parser.add_argument("--only", choices=("micro", "macro"), help="run one group only")
+    parser.add_argument("--candidates", type=int, nargs="+", default=list(CANDIDATE_COUNTS),
+                        help="candidate pool sizes for the macro run (default: %(default)s)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent per benchmark (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("flavorbridge").setLevel(logging.ERROR)  # Fallback/not-found warnings are expected noise here
+    results = []
+    if args.only in (None, "micro"):
+        results += micro_benchmarks(args.min_time)
+        results += ranking_benchmarks(tuple(args.candidates), args.min_time)
+    if args.only in (None, "macro"):
+        results += macro_benchmarks(tuple(args.candidates), args.min_time)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {result_key(r): r for r in json.load(f)["results"]}
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=1)
+        print(f"\nWrote {len(results)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
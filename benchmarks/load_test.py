@@ -0,0 +1,310 @@
+"""
+HTTP load test for api.py.
+
+Closed-loop workers drive /api/recommend, /api/recipe/search,
+/api/allergen/substitutes and /api/data in a weighted mix at a fixed
+concurrency, and report throughput plus p50/p95/p99 and a latency histogram
+per route. By default it starts foodoscope_stub and the API (flask run,
+threaded) as subprocesses on free ports, so runs are reproducible offline.
+
+Run:  python benchmarks/load_test.py --concurrency 16 --duration 30 --stub-latency-ms 80
+      python benchmarks/load_test.py --target http://127.0.0.1:5000 --output load.json
+"""
+
+from __future__ import annotations
+import argparse
+import atexit
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data import mock_data  # noqa: E402
+
+ROUTES = ("recommend", "search", "substitutes", "data")
+DEFAULT_MIX = "recommend=4,search=3,substitutes=2,data=1"
+# Histogram bucket upper bounds in ms (last bucket is open-ended)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_DISHES = ["Chicken Curry", "Beef Stew", "Lentil Soup", "Vegetable Biryani", "Chicken Noodles", "Fish Pie",
+           "Judy's Hearty Vegetable Minestrone Soup", "Chinese-Style Broccoli Salad", "Spicy Cabbage Kimchi",
+           "Creamy Chicken Pasta", "Smoky Beef Tacos", "Garlic Shrimp Rice"]
+_QUERIES = ["chicken", "curry", "soup", "beef", "lentil", "noodles", "salad", "kimchi", "pasta", "stew",
+            "biryani", "spicy", "creamy", "rice", "tacos", "fish pie", "chicken curry", "beef stew"]
+
+
+# --- Request Generation ---
+
+class RequestFactory:
+    """
+    Seeded request bodies per route. `distinct` caps how many different
+    requests each route sees, which sets the achievable cache hit rate.
+    """
+
+    def __init__(self, distinct: int, seed: int):
+        rng = random.Random(seed)
+        cuisines = mock_data.TARGET_CUISINES
+        allergens = list(dict.fromkeys(mock_data.COMMON_ALLERGENS + list(mock_data.ALLERGEN_SUBSTITUTES)))
+        self.pools: dict[str, list[tuple[str, str, dict | None]]] = {
+            "recommend": [
+                ("POST", "/api/recommend", {"comfortDish": rng.choice(_DISHES), "targetCuisine": rng.choice(cuisines),
+                                            "excludedAllergens": rng.sample(["dairy", "nuts", "soy", "seafood"], rng.randint(0, 2))})
+                for _ in range(distinct)
+            ],
+            "search": [("POST", "/api/recipe/search", {"query": rng.choice(_QUERIES)}) for _ in range(distinct)],
+            "substitutes": [("POST", "/api/allergen/substitutes", {"allergen": rng.choice(allergens)}) for _ in range(distinct)],
+            "data": [("GET", "/api/data", None)],
+        }
+
+    def pick(self, route: str, rng: random.Random) -> tuple[str, str, dict | None]:
+        return rng.choice(self.pools[route])
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"unknown route {route!r} (expected one of {', '.join(ROUTES)})")
+        mix[route] = float(weight or 1)
+    return {route: weight for route, weight in mix.items() if weight > 0}
+
+
+# --- Recording ---
+
+class RouteStats:
+    """Latency samples and outcome counts for one route (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms: list[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.bytes = 0
+
+    def record(self, latency_ms: float, status: int | None, size: int) -> None:
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            if status is None:
+                self.errors += 1
+                self.statuses["exception"] += 1
+            else:
+                self.statuses[str(status)] += 1
+                if status >= 400:
+                    self.errors += 1
+            self.bytes += size
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        samples = sorted(self.latencies_ms)
+        count = len(samples)
+
+        def pct(p: float) -> float:
+            return round(samples[min(count - 1, max(0, math.ceil(p * count) - 1))], 3) if count else 0.0
+
+        histogram = Counter()
+        for latency in samples:
+            bound = next((b for b in BUCKETS_MS if latency <= b), None)
+            histogram[f"<={bound}ms" if bound is not None else f">{BUCKETS_MS[-1]}ms"] += 1
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(samples) / count, 3) if count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1], 3) if count else 0.0,
+            "avg_bytes": round(self.bytes / count) if count else 0,
+            "histogram": {label: histogram[label] for label in
+                          [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"] if histogram[label]},
+        }
+
+
+def worker(base_url: str, factory: RequestFactory, mix: dict[str, float], stats: dict[str, RouteStats],
+           stop_at: float, record_after: float, seed: int) -> None:
+    rng = random.Random(seed)
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip"
+    routes, weights = list(mix), list(mix.values())
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        route = rng.choices(routes, weights)[0]
+        method, path, body = factory.pick(route, rng)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=30)
+            status, size = response.status_code, len(response.content)
+        except requests.RequestException:
+            status, size = None, 0
+        if start >= record_after:  # Warm-up requests aren't recorded
+            stats[route].record((time.perf_counter() - start) * 1000, status, size)
+
+
+# --- Local Stack ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args[1:3]} exited with {process.returncode} before becoming ready")
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_local_stack(args: argparse.Namespace) -> tuple[str, list[subprocess.Popen]]:
+    """Start foodoscope_stub and the API as subprocesses. Returns (API base URL, processes)."""
+    stub_port, api_port = _free_port(), _free_port()
+    stub_root = f"http://127.0.0.1:{stub_port}"
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "foodoscope_stub.py"), "--port", str(stub_port), "--quiet",
+         "--latency-ms", str(args.stub_latency_ms), "--jitter-ms", str(args.stub_jitter_ms),
+         "--error-rate", str(args.stub_error_rate), "--recipes", str(args.stub_recipes)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    processes = [stub]
+    table_dir = tempfile.mkdtemp(prefix="flavorbridge-load-")
+    atexit.register(shutil.rmtree, table_dir, True)
+    try:
+        _wait_ready(f"{stub_root}/_stub/stats", stub)
+        env = {
+            **os.environ,
+            "API_BASE_URL": f"{stub_root}/recipe2-api",
+            "FLAVORDB_BASE_URL": f"{stub_root}/flavordb",
+            "SEARCH_INDEX_PATH": "",  # Don't read or write the developer's index
+            "SUBSTITUTE_WARMUP": "false",
+            "SUBSTITUTE_TABLE_PATH": os.path.join(table_dir, "substitute_table.json"),
+            "LOG_LEVEL": "WARNING",
+        }
+        api = subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", "api", "run", "--port", str(api_port), "--with-threads"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        processes.append(api)
+        api_url = f"http://127.0.0.1:{api_port}"
+        _wait_ready(f"{api_url}/api/health", api)
+    except BaseException:
+        stop_processes(processes)
+        raise
+    return api_url, processes
+
+
+def stop_processes(processes: list[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- Reporting ---
+
+def print_report(summaries: dict[str, dict[str, Any]], elapsed: float, concurrency: int) -> None:
+    print(f"\n{concurrency} workers, {elapsed:.1f}s measured\n")
+    print(f"{'route':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'max_ms':>9}")
+    for route, s in summaries.items():
+        print(f"{route:<12} {s['requests']:>9} {s['errors']:>7} {s['throughput_rps']:>9.1f} "
+              f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    for route, s in summaries.items():
+        if not s["requests"]:
+            continue
+        print(f"\n{route} latency histogram")
+        widest = max(s["histogram"].values())
+        for label, count in s["histogram"].items():
+            print(f"  {label:>9} {count:>8}  {'#' * max(1, round(40 * count / widest))}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the FlavorBridge API.")
+    parser.add_argument("--target", help="base URL of a running API (default: start stub + API locally)")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop workers (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds (default: %(default)s)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds first (default: %(default)s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights (default: %(default)s)")
+    parser.add_argument("--distinct", type=int, default=50,
+                        help="distinct requests per route; lower means more cache hits (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    stub = parser.add_argument_group("local upstream stand-in (ignored with --target)")
+    stub.add_argument("--stub-latency-ms", type=float, default=50.0)
+    stub.add_argument("--stub-jitter-ms", type=float, default=20.0)
+    stub.add_argument("--stub-error-rate", type=float, default=0.0)
+    stub.add_argument("--stub-recipes", type=int, default=3000, help="synthetic recipes in the stub catalogue")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    processes: list[subprocess.Popen] = []
+    base_url = args.target.rstrip("/") if args.target else None
+    if base_url is None:
+        base_url, processes = start_local_stack(args)
+        print(f"Started foodoscope_stub and API at {base_url}")
+
+    try:
+        factory = RequestFactory(args.distinct, args.seed)
+        stats = {route: RouteStats() for route in mix}
+        record_after = time.perf_counter() + args.warmup
+        stop_at = record_after + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(base_url, factory, mix, stats, stop_at, record_after, args.seed + i),
+                             daemon=True)
+            for i in range(args.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = args.duration
+        summaries = {route: s.summary(elapsed) for route, s in stats.items()}
+        try:
+            server_stats = requests.get(f"{base_url}/api/stats", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            server_stats = None
+    finally:
+        stop_processes(processes)
+
+    print_report(summaries, elapsed, args.concurrency)
+    if args.output:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "routes": summaries,
+            "total_rps": round(sum(s["throughput_rps"] for s in summaries.values()), 2),
+            "server_stats": server_stats,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"\nWrote report to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Bounded in-process TTL + LRU cache used in front of upstream lookups.
+Supports per-cache TTLs, negative caching for "not found" answers and
+hit/miss/eviction counters.
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Returned by TTLCache.get() when a key is absent or expired
+MISSING = object()
+
+# Every cache registers itself here so stats can be reported in one place
+_REGISTRY: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a TTL.
+
+    Args:
+        name: Name used in stats output
+        maxsize: Max number of entries before least-recently-used eviction
+        ttl: Default lifetime (seconds) for positive entries
+        negative_ttl: Lifetime (seconds) for negative ("not found") entries
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, negative_ttl: float | None = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data: OrderedDict[Hashable, tuple[float, bool, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        _REGISTRY[name] = self
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value (which may be a negative entry) or MISSING."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, negative, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            if negative:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Any:
+        """Like get(), but does not touch LRU order or counters (for re-checks under single-flight)."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return MISSING
+        return entry[2]
+
+    def set(self, key: Hashable, value: Any, negative: bool = False, ttl: float | None = None) -> None:
+        """Store value. Negative entries use negative_ttl unless ttl is given."""
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, negative, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def expires_at(self, key: Hashable) -> float | None:
+        """Monotonic expiry time of a live entry, or None. Does not touch LRU order or counters."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def all_stats() -> dict[str, dict[str, Any]]:
+    """Stats for every cache created in this process, keyed by cache name."""
+    return {name: c.stats() for name, c in _REGISTRY.items()}
@@ -0,0 +1,137 @@
+"""
+Negotiated response compression for the Flask API.
+An after_request hook brotli- or gzip-encodes JSON/text bodies above a size
+threshold, picking the encoding from the client's Accept-Encoding. Bytes in,
+bytes out and bytes saved are tallied per route for /api/stats.
+"""
+
+from __future__ import annotations
+import gzip
+import os
+import threading
+from typing import Any
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is always available
+    brotli = None
+
+# --- Configuration ---
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # Bytes; smaller bodies aren't worth a round of deflate
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))  # 4-6 is brotli's sweet spot for dynamic content
+COMPRESSIBLE_MIMETYPES = frozenset({"application/json", "text/plain", "text/html", "text/css", "application/javascript"})
+
+_lock = threading.Lock()
+_route_stats: dict[str, dict[str, int]] = {}
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _negotiate() -> str | None:
+    accepted = request.accept_encodings
+    best = None
+    best_quality = 0.0
+    for encoding in available_encodings():
+        quality = accepted[encoding]
+        if quality > best_quality:  # Ties keep the earlier (preferred) encoding
+            best, best_quality = encoding, quality
+    return best
+
+
+def _encode(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def record(route: str, bytes_in: int, bytes_out: int) -> None:
+    """
+    Tally one response for route. Also used by handlers that serve
+    precompressed bodies themselves.
+
+    Args:
+        route: URL rule (e.g. "/api/recipe/<recipe_title>")
+        bytes_in: Uncompressed body size
+        bytes_out: Size actually sent
+    """
+    with _lock:
+        entry = _route_stats.get(route)
+        if entry is None:
+            entry = _route_stats[route] = {"responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0}
+        entry["responses"] += 1
+        entry["compressed"] += bytes_out < bytes_in
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook: compress the body in place when it's worth it and the client accepts it."""
+    if (
+        response.direct_passthrough  # Streaming (SSE) or file responses
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers  # Already encoded (e.g. precompressed /api/data)
+        or request.method == "HEAD"
+    ):
+        return response
+
+    body = response.get_data()
+    size = len(body)
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or size < COMPRESS_MIN_SIZE:
+        record(_route(), size, size)
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate()
+    if encoding is None:
+        record(_route(), size, size)
+        return response
+
+    compressed = _encode(body, encoding)
+    if len(compressed) >= size:
+        record(_route(), size, size)
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    # The encoded body is a different representation; a strong ETag must not match the identity one
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    record(_route(), size, len(compressed))
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Register compress_response as an after_request hook on app."""
+    app.after_request(compress_response)
+
+
+def stats() -> dict[str, Any]:
+    """Per-route byte counters plus the active settings."""
+    with _lock:
+        routes = {
+            route: {
+                **entry,
+                "bytes_saved": entry["bytes_in"] - entry["bytes_out"],
+                "ratio": round(entry["bytes_out"] / entry["bytes_in"], 4) if entry["bytes_in"] else 1.0,
+            }
+            for route, entry in sorted(_route_stats.items())
+        }
+    return {
+        "min_size": COMPRESS_MIN_SIZE,
+        "encodings": list(available_encodings()),
+        "routes": routes,
+        "bytes_saved": sum(entry["bytes_saved"] for entry in routes.values()),
+    }
@@ -4,18 +4,34 @@ Uses real Foodoscope API for recipe data.
 """
 
 from __future__ import annotations
+import contextvars
+import hashlib
+import heapq
 import math
-import requests
-from typing import Any
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Iterator, Mapping
+import logging
 import os # Import the os module
 from dotenv import load_dotenv
 
+import batch_scoring
+import metrics
+import upstream
+from cache import MISSING, TTLCache
+from singleflight import SingleFlight
+from keyword_matcher import KeywordAutomaton
 from src.data import mock_data
 
 load_dotenv()
 
+logger = logging.getLogger("flavorbridge.pipeline")
+
 # --- API Configuration ---
-API_BASE_URL = "https://api.foodoscope.com/recipe2-api"
+API_BASE_URL = os.getenv("API_BASE_URL", "https://api.foodoscope.com/recipe2-api").rstrip("/")  # Point at foodoscope_stub.py for offline runs
 API_KEY = os.getenv("API_KEY") # Get the token from environment variables
 API_HEADERS = {
     "Authorization": f"Bearer {API_KEY}",
@@ -69,74 +85,234 @@ PROTEIN_MAP = mock_data.PROTEIN_MAP
 ALLERGEN_KEYWORDS_BACKEND = mock_data.ALLERGEN_KEYWORDS_BACKEND
 MOCK_FOOD_PAIR = mock_data.MOCK_FOOD_PAIR
 
+# --- Keyword Automaton ---
+# Dish-name words checked directly by _get_ingredients_from_title / _infer_flavor_style
+TITLE_KEYWORDS = ["vegetable", "minestrone", "broccoli", "zucchini", "curry", "lentil", "biryani",
+                  "soup", "salad", "kimchi", "sauce"]
+
+# One automaton over every keyword list: a single pass over a text yields the
+# hits for all categories, with the same answer as `kw in text` per keyword.
+KEYWORD_AUTOMATON = KeywordAutomaton(
+    COMMON_INGREDIENTS_LOWER
+    + [kw for kws in METHOD_KEYWORDS.values() for kw in kws]
+    + [kw for kws in TEXTURE_KEYWORDS.values() for kw in kws]
+    + [kw for kws in COMFORT_KEYWORDS.values() for kw in kws]
+    + [kw for kws in ADAPTABILITY_KEYWORDS.values() for kw in kws]
+    + [kw for kws in PROTEIN_MAP.values() for kw in kws]
+    + TITLE_KEYWORDS
+)
+COMMON_INGREDIENTS_SET = frozenset(COMMON_INGREDIENTS_LOWER)
+
+# --- Ingredient Bitsets ---
+# Extracted ingredients come from the closed COMMON_INGREDIENTS vocabulary, so a
+# set of them fits in one int. Bits follow sorted order, so decoding a mask
+# yields names already sorted.
+INGREDIENT_AXES = tuple(sorted(COMMON_INGREDIENTS_SET))
+INGREDIENT_BITS = {ing: 1 << i for i, ing in enumerate(INGREDIENT_AXES)}
+assert len(INGREDIENT_AXES) <= 64, "batch_scoring packs ingredient bitsets into one uint64"
+
+# Every value _get_ingredients_from_title can return (allergen checks run on these)
+TITLE_INGREDIENT_AXES = tuple(dict.fromkeys(
+    [kws[0] for kws in PROTEIN_MAP.values()] + ["vegetable", "chicken", "coconut", "lentil", "rice", "unknown"]
+))
+TITLE_INGREDIENT_BITS = {ing: 1 << i for i, ing in enumerate(TITLE_INGREDIENT_AXES)}
+
+
+@lru_cache(maxsize=4096)
+def _keyword_hits(text: str) -> frozenset[str]:
+    """All automaton keywords found in text. Memoized: the same steps get scanned by several detectors."""
+    return frozenset(KEYWORD_AUTOMATON.matches(text))
+
+
+def _keyword_sets(table: dict[str, list[str]]) -> dict[str, frozenset[str]]:
+    return {category: frozenset(kws) for category, kws in table.items()}
+
+
+# Per-category keyword sets: counting a category's hits is one set intersection
+METHOD_KEYWORD_SETS = _keyword_sets(METHOD_KEYWORDS)
+TEXTURE_KEYWORD_SETS = _keyword_sets(TEXTURE_KEYWORDS)
+COMFORT_KEYWORD_SETS = _keyword_sets(COMFORT_KEYWORDS)
+ADAPTABILITY_KEYWORD_SETS = _keyword_sets(ADAPTABILITY_KEYWORDS)
+PROTEIN_KEYWORD_SETS = _keyword_sets(PROTEIN_MAP)
+
+
+def _count_hits(keywords: frozenset[str], hits: frozenset[str]) -> int:
+    return len(keywords & hits)
+
+
+# --- Upstream Response Caches ---
+# Instructions keyed by Recipe_id essentially never change, so they get a long TTL.
+RECIPE_CACHE_TTL = float(os.getenv("RECIPE_CACHE_TTL", "3600"))
+INSTRUCTIONS_CACHE_TTL = float(os.getenv("INSTRUCTIONS_CACHE_TTL", str(7 * 24 * 3600)))
+REGION_CACHE_TTL = float(os.getenv("REGION_CACHE_TTL", "1800"))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+
+RECIPE_CACHE = TTLCache("recipe_by_title", maxsize=1024, ttl=RECIPE_CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL)
+INSTRUCTIONS_CACHE = TTLCache("instructions", maxsize=4096, ttl=INSTRUCTIONS_CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL)
+REGION_CACHE = TTLCache("recipes_by_region", maxsize=256, ttl=REGION_CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL)
+
+# Concurrent cache misses for the same key share one upstream request
+RECIPE_FLIGHT = SingleFlight("recipe_by_title")
+INSTRUCTIONS_FLIGHT = SingleFlight("instructions")
+REGION_FLIGHT = SingleFlight("recipes_by_region")
+
+# Workers for region fetches that overlap a request's source branch. Sized to the
+# HTTP pool by default, since more concurrent fetches than connections would only
+# queue there. When every worker is busy the request fetches inline instead of
+# queueing. Batches run their fetches on a pool of their own, at most this wide.
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", str(upstream.POOL_MAXSIZE)))
+_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="upstream-fetch")
+_fetch_slots = threading.BoundedSemaphore(FETCH_WORKERS)
+
+# --- Ranking Configuration ---
+DEFAULT_TOP_K = int(os.getenv("RECOMMEND_TOP_K", "3"))  # Recommendations returned when a request doesn't ask
+MAX_TOP_K = int(os.getenv("RECOMMEND_MAX_TOP_K", "50"))  # Upper bound for a per-request top_k
+# Region recipes fetched as candidates per recommendation. Pools of
+# batch_scoring.BATCH_SCORING_MIN_CANDIDATES or more are ranked with NumPy.
+CANDIDATE_LIMIT = int(os.getenv("RECOMMEND_CANDIDATE_LIMIT", "10"))
+
+
+class UpstreamError(Exception):
+    """Transient upstream failure (network error or unexpected status). Never cached."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Recipe Observers ---
+# Called with every recipe list parsed from an upstream response (sync and
+# async paths alike), e.g. to feed the local search index. Observer errors
+# are logged and never reach the fetch.
+_RECIPE_OBSERVERS: list[Callable[[list[dict]], None]] = []
+
+
+def add_recipe_observer(observer: Callable[[list[dict]], None]) -> None:
+    """Register observer(recipes) to be called with recipes seen in upstream responses."""
+    if observer not in _RECIPE_OBSERVERS:
+        _RECIPE_OBSERVERS.append(observer)
+
+
+def notify_recipes(recipes: list[dict]) -> None:
+    """Hand recipes from an upstream response to every registered observer."""
+    for observer in _RECIPE_OBSERVERS:
+        try:
+            observer(recipes)
+        except Exception:
+            logger.exception("Recipe observer %r failed", observer)
+
+
+def _title_cache_key(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def _region_cache_key(region: str, diet: str, limit: int) -> tuple[str, str, int]:
+    return (" ".join(region.lower().split()), diet, limit)
+
 
 # === API FUNCTIONS ===
+# Request building and response parsing are shared with flavor_bridge_async;
+# both requests.Response and httpx.Response expose status_code / json() / text.
+
+def _recipe_by_title_request(title: str) -> tuple[str, dict]:
+    url = f"{API_BASE_URL}/recipe-bytitle/recipeByTitle"
+    params = {"title": title}
+    logger.debug("API call: recipe by title url=%s params=%s", url, params)
+    return url, params
+
+
+def _parse_recipe_by_title(response: Any) -> dict | None:
+    """Returns the first match, None when nothing matches. Raises UpstreamError on failure."""
+    if response.status_code != 200:
+        logger.warning("recipeByTitle failed: status=%s body=%.200s", response.status_code, response.text)
+        raise UpstreamError(f"recipeByTitle returned status {response.status_code}", response.status_code)
+
+    data = response.json()
+    if data.get("success") and data.get("data"):
+        recipes = data["data"]
+        logger.debug("recipeByTitle: %d recipe(s), first match %r", len(recipes), recipes[0].get("Recipe_title", "Unknown"))
+        notify_recipes(recipes)
+        return recipes[0]
+
+    logger.debug("recipeByTitle: no recipes (message=%r)", data.get("message", "No message"))
+    return None
+
 
 def fetch_recipe_by_title(title: str) -> dict | None:
-    """Fetch recipe from API by title."""
+    """Fetch recipe from API by title. Hits and "not found" answers are cached."""
+    key = _title_cache_key(title)
+    cached = RECIPE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    def load() -> dict | None:
+        # Re-check: a flight for this key may have finished since the miss above
+        cached = RECIPE_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        url, params = _recipe_by_title_request(title)
+        recipe = _parse_recipe_by_title(upstream.get(url, params=params, headers=API_HEADERS))
+        RECIPE_CACHE.set(key, recipe, negative=recipe is None)
+        return recipe
+
     try:
-        url = f"{API_BASE_URL}/recipe-bytitle/recipeByTitle"
-        params = {"title": title}
-        print(f"\n🔍 API CALL: Recipe by Title")
-        print(f"   URL: {url}")
-        print(f"   Params: {params}")
-        
-        response = requests.get(url, params=params, headers=API_HEADERS, timeout=10)
-        
-        print(f"   Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"   Response: {data.get('message', 'No message')}")
-            
-            if data.get("success") and data.get("data"):
-                recipes = data["data"]
-                print(f"   ✅ Found {len(recipes)} recipe(s)")
-                if recipes and len(recipes) > 0:
-                    print(f"   📋 First match: {recipes[0].get('Recipe_title', 'Unknown')}")
-                    return recipes[0]
-            else:
-                print(f"   ❌ No recipes found in response")
-        else:
-            print(f"   ❌ Failed with status {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
-        
-        return None
+        return RECIPE_FLIGHT.do(key, load)
     except Exception as e:
-        print(f"❌ ERROR fetching recipe by title: {e}")
+        logger.error("Error fetching recipe by title %r: %s", title, e)
+        return None
+
+
+def _instructions_request(recipe_id: str) -> str:
+    url = f"{API_BASE_URL}/instructions/{recipe_id}"
+    logger.debug("API call: recipe instructions url=%s", url)
+    return url
+
+
+def _parse_instructions(response: Any) -> list[str] | None:
+    """Returns the steps, None when the recipe has none. Raises UpstreamError on failure."""
+    if response.status_code == 404:
+        logger.debug("instructions: not found (404)")
         return None
+    if response.status_code != 200:
+        logger.warning("instructions failed: status=%s body=%.200s", response.status_code, response.text)
+        raise UpstreamError(f"instructions returned status {response.status_code}", response.status_code)
+
+    data = response.json()
+    if "steps" in data:
+        steps = data["steps"]
+        logger.debug("instructions: %d cooking steps", len(steps))
+        return steps
+
+    logger.debug("instructions: no 'steps' field (keys=%s)", list(data.keys()))
+    return None
+
+
+def _store_instructions(key: str, steps: list[str] | None) -> list[str]:
+    if steps is None:
+        INSTRUCTIONS_CACHE.set(key, [], negative=True)
+        return []
+    INSTRUCTIONS_CACHE.set(key, steps)
+    return steps
 
 
 def fetch_recipe_instructions(recipe_id: str) -> list[str]:
-    """Fetch recipe instructions from API by recipe_id."""
+    """Fetch recipe instructions from API by recipe_id. Cached with a long TTL."""
+    key = str(recipe_id)
+    cached = INSTRUCTIONS_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    def load() -> list[str]:
+        cached = INSTRUCTIONS_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        steps = _parse_instructions(upstream.get(_instructions_request(recipe_id), headers=API_HEADERS))
+        return _store_instructions(key, steps)
+
     try:
-        url = f"{API_BASE_URL}/instructions/{recipe_id}"
-        print(f"\n📖 API CALL: Recipe Instructions")
-        print(f"   URL: {url}")
-        print(f"   Recipe ID: {recipe_id}")
-        
-        response = requests.get(url, headers=API_HEADERS, timeout=10)
-        
-        print(f"   Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            if "steps" in data:
-                steps = data["steps"]
-                print(f"   ✅ Found {len(steps)} cooking steps")
-                if steps:
-                    print(f"   First step: {steps[0][:80]}...")
-                return steps
-            else:
-                print(f"   ❌ No 'steps' field in response")
-                print(f"   Response keys: {list(data.keys())}")
-        else:
-            print(f"   ❌ Failed with status {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
-        
-        return []
+        return INSTRUCTIONS_FLIGHT.do(key, load)
     except Exception as e:
-        print(f"❌ ERROR fetching instructions: {e}")
+        logger.error("Error fetching instructions for %r: %s", recipe_id, e)
         return []
 
 
@@ -152,81 +328,116 @@ def _normalize_region_name(region: str) -> str:
     if " and " in region.lower():
         parts = region.split(" and ")
         normalized = parts[0].strip()
-        print(f"\n⚠️  Compound region detected: '{region}'")
-        print(f"   Using first region: '{normalized}'")
+        logger.info("Compound region %r, using first region %r", region, normalized)
         return normalized
     
     # Handle other separators
     if "/" in region:
         parts = region.split("/")
         normalized = parts[0].strip()
-        print(f"\n⚠️  Compound region detected: '{region}'")
-        print(f"   Using first region: '{normalized}'")
+        logger.info("Compound region %r, using first region %r", region, normalized)
         return normalized
     
     return region
 
 
+def _region_request(region: str, diet: str, limit: int) -> tuple[str, dict]:
+    # Normalize region name
+    normalized_region = _normalize_region_name(region)
+    url = f"{API_BASE_URL}/recipe/region-diet/region-diet"
+    params = {
+        "region": normalized_region,
+        "diet": 'vegan',
+        "limit": limit
+    }
+    if diet:
+        params["diet"] = diet
+    
+    logger.debug("API call: recipes by region url=%s params=%s", url, params)
+    return url, params
+
+
+def _parse_region(response: Any) -> list[dict] | None:
+    """Returns the recipes, None when the region has none. Raises UpstreamError on failure."""
+    if response.status_code != 200:
+        # 400 is retried with alternative names by the caller
+        level = logging.DEBUG if response.status_code == 400 else logging.WARNING
+        logger.log(level, "region-diet failed: status=%s body=%.200s", response.status_code, response.text)
+        raise UpstreamError(f"region-diet returned status {response.status_code}", response.status_code)
+
+    data = response.json()
+    if data.get("success") and data.get("data"):
+        recipes = data["data"]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("region-diet: %d recipes, sample %s",
+                         len(recipes), [r.get("Recipe_title", "Unknown") for r in recipes[:5]])
+        notify_recipes(recipes)
+        return recipes
+
+    logger.debug("region-diet: no recipes (message=%r)", data.get("message", "No message"))
+    return None
+
+
+def _alternative_region_params(region: str, params: dict) -> list[dict]:
+    """Param sets to retry with when the API rejects a region name (HTTP 400)."""
+    logger.debug("Region %r rejected, trying alternative spellings", region)
+    return [{**params, "region": alt} for alt in _get_alternative_region_names(region)]
+
+
+def _parse_alternative_region(response: Any, alt_region: str) -> list[dict] | None:
+    if response.status_code == 200:
+        data = response.json()
+        if data.get("success") and data.get("data"):
+            logger.info("Region resolved with alternative name %r", alt_region)
+            notify_recipes(data["data"])
+            return data["data"]
+    logger.debug("Alternative region %r: no recipes (status=%s)", alt_region, response.status_code)
+    return None
+
+
+def _store_region(key: tuple[str, str, int], recipes: list[dict] | None) -> list[dict]:
+    if recipes is None:
+        REGION_CACHE.set(key, [], negative=True)
+        return []
+    REGION_CACHE.set(key, recipes)
+    return recipes
+
+
+def _request_recipes_by_region(region: str, diet: str, limit: int) -> list[dict] | None:
+    """Call region-diet, retrying alternative names on HTTP 400. None means no recipes."""
+    url, params = _region_request(region, diet, limit)
+    try:
+        return _parse_region(upstream.get(url, params=params, headers=API_HEADERS))
+    except UpstreamError as e:
+        if e.status != 400:
+            raise
+
+    for alt_params in _alternative_region_params(region, params):
+        response = upstream.get(url, params=alt_params, headers=API_HEADERS)
+        recipes = _parse_alternative_region(response, alt_params["region"])
+        if recipes:
+            return recipes
+    # Unknown region name: a definitive "not found"
+    return None
+
+
 def fetch_recipes_by_region(region: str, diet: str = "", limit: int = 10) -> list[dict]:
-    """Fetch recipes from API by region and optional diet."""
+    """Fetch recipes from API by region and optional diet. Cached per (region, diet, limit)."""
+    key = _region_cache_key(region, diet, limit)
+    cached = REGION_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    def load() -> list[dict]:
+        cached = REGION_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        return _store_region(key, _request_recipes_by_region(region, diet, limit))
+
     try:
-        # Normalize region name
-        normalized_region = _normalize_region_name(region)
-        url = f"{API_BASE_URL}/recipe/region-diet/region-diet"
-        params = {
-            "region": normalized_region,
-            "diet": 'vegan',
-            "limit": limit
-        }
-        if diet:
-            params["diet"] = diet
-        
-        print(f"\n🌍 API CALL: Recipes by Region")
-        print(f"   URL: {url}")
-        print(f"   Params: {params}")
-        
-        response = requests.get(url, params=params, headers=API_HEADERS, timeout=10)
-        
-        print(f"   Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"   Response: {data.get('message', 'No message')}")
-            
-            if data.get("success") and data.get("data"):
-                recipes = data["data"]
-                print(f"   ✅ Found {len(recipes)} recipes")
-                
-                # Show first few recipe titles
-                if recipes:
-                    print(f"   Sample recipes:")
-                    for i, r in enumerate(recipes[:5], 1):
-                        print(f"      {i}. {r.get('Recipe_title', 'Unknown')}")
-                
-                return recipes
-            else:
-                print(f"   ❌ No recipes found in response")
-        else:
-            print(f"   ❌ Failed with status {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
-            
-            # Try alternative region names if first attempt failed
-            if response.status_code == 400:
-                print(f"\n   💡 Trying alternative region spellings...")
-                alternatives = _get_alternative_region_names(region)
-                for alt_region in alternatives:
-                    print(f"   Trying: '{alt_region}'")
-                    params["region"] = alt_region
-                    response = requests.get(url, params=params, headers=API_HEADERS, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("success") and data.get("data"):
-                            print(f"   ✅ Success with alternative name: '{alt_region}'")
-                            return data["data"]
-        
-        return []
+        return REGION_FLIGHT.do(key, load)
     except Exception as e:
-        print(f"❌ ERROR fetching recipes by region: {e}")
+        logger.error("Error fetching recipes by region %r: %s", region, e)
         return []
 
 
@@ -282,46 +493,45 @@ def extract_ingredients_from_instructions(instructions: list[str]) -> list[str]:
     Returns:
         List of matched ingredients found in the instructions
     """
-    found_ingredients = set()
-    
-    # Combine all instructions into one text for searching
-    full_text = " ".join(instructions).lower()
-    
-    # Search for each common ingredient in the instructions
-    for ingredient in COMMON_INGREDIENTS_LOWER:
-        if ingredient in full_text:
-            found_ingredients.add(ingredient)
-    
-    # Convert to sorted list for consistency
-    result = sorted(list(found_ingredients))
-    
-    return result
+    # Combine all instructions into one text and scan it once
+    return _ingredients_from_hits(_keyword_hits(" ".join(instructions).lower()))
+
+
+def _ingredients_from_hits(hits: frozenset[str]) -> list[str]:
+    # Sorted for consistency
+    return sorted(hits & COMMON_INGREDIENTS_SET)
 
 
 def _get_ingredients_from_title(title: str) -> list[str]:
     """Infer ingredients from recipe title for allergen check."""
-    t = title.lower()
+    return _title_ingredients_from_hits(_keyword_hits(title.lower()))
+
+
+def _title_ingredients_from_hits(hits: frozenset[str]) -> list[str]:
     out = []
-    for _, kws in PROTEIN_MAP.items():
-        if any(kw in t for kw in kws):
+    for protein, kws in PROTEIN_MAP.items():
+        if not PROTEIN_KEYWORD_SETS[protein].isdisjoint(hits):
             out.extend(kws[:1])
-    if "vegetable" in t or "minestrone" in t or "broccoli" in t or "zucchini" in t:
+    if "vegetable" in hits or "minestrone" in hits or "broccoli" in hits or "zucchini" in hits:
         out.extend(["vegetable"])
-    if "curry" in t:
+    if "curry" in hits:
         out.extend(["chicken", "coconut"])
-    if "lentil" in t:
+    if "lentil" in hits:
         out.extend(["lentil"])
-    if "biryani" in t:
+    if "biryani" in hits:
         out.extend(["rice"])
     return out if out else ["unknown"]
 
 
 def detect_cooking_method(instructions: list[str]) -> str:
     """Detect primary cooking method from steps using METHOD_KEYWORDS."""
-    text = " ".join(s.lower() for s in instructions)
+    return _method_from_hits(_keyword_hits(" ".join(s.lower() for s in instructions)))
+
+
+def _method_from_hits(hits: frozenset[str]) -> str:
     best_method, best_count = "slow_saucy", 0
-    for method, keywords in METHOD_KEYWORDS.items():
-        count = sum(1 for kw in keywords if kw in text)
+    for method, keywords in METHOD_KEYWORD_SETS.items():
+        count = _count_hits(keywords, hits)
         if count > best_count:
             best_count, best_method = count, method
     return best_method
@@ -329,23 +539,29 @@ def detect_cooking_method(instructions: list[str]) -> str:
 
 def detect_protein(recipe_title: str) -> str:
     """Detect protein type from recipe title using PROTEIN_MAP."""
-    t = recipe_title.lower()
-    for protein, keywords in PROTEIN_MAP.items():
-        if any(kw in t for kw in keywords):
+    return _protein_from_hits(_keyword_hits(recipe_title.lower()))
+
+
+def _protein_from_hits(hits: frozenset[str]) -> str:
+    for protein, keywords in PROTEIN_KEYWORD_SETS.items():
+        if not keywords.isdisjoint(hits):
             return protein
     return ""
 
 
 def _infer_flavor_style(recipe_title: str, method: str) -> dict[str, float]:
     """Infer flavor style from dish name and cooking method."""
-    title = recipe_title.lower()
+    return _flavor_from_hits(_keyword_hits(recipe_title.lower()), method)
+
+
+def _flavor_from_hits(hits: frozenset[str], method: str) -> dict[str, float]:
     vector = {}
-    if "curry" in title or "soup" in title:
+    if "curry" in hits or "soup" in hits:
         vector["savory"] = 0.4
         vector["aromatic"] = 0.3
-    if "salad" in title:
+    if "salad" in hits:
         vector["fresh"] = 0.5
-    if "kimchi" in title or "sauce" in title:
+    if "kimchi" in hits or "sauce" in hits:
         vector["bold"] = 0.4
     if method == "slow_saucy":
         vector["comfort"] = 0.5
@@ -370,6 +586,37 @@ def flavor_similarity(source_vector: dict, target_vector: dict) -> float:
     return max(0.0, min(1.0, dot / (mag_s * mag_t)))
 
 
+def ingredient_mask(ingredients: list[str]) -> int:
+    """Bitset of extracted ingredients over INGREDIENT_AXES."""
+    mask = 0
+    for ing in ingredients:
+        mask |= INGREDIENT_BITS[ing.lower().strip()]
+    return mask
+
+
+def decode_ingredient_mask(mask: int) -> list[str]:
+    """Ingredient names (sorted) for the bits set in mask."""
+    names = []
+    while mask:
+        low = mask & -mask
+        names.append(INGREDIENT_AXES[low.bit_length() - 1])
+        mask ^= low
+    return names
+
+
+def _mask_jaccard(a: int, b: int) -> float:
+    """Jaccard of two ingredient bitsets; 0.0 if either is empty (as ingredient_similarity)."""
+    if not a or not b:
+        return 0.0
+    return (a & b).bit_count() / (a | b).bit_count()
+
+
+def _profile_ingredient_similarity(source: dict | RecipeProfile, target: dict | RecipeProfile) -> float:
+    if isinstance(source, RecipeProfile) and isinstance(target, RecipeProfile):
+        return _mask_jaccard(source.ingredient_mask, target.ingredient_mask)
+    return ingredient_similarity(source.get("ingredients_extracted", []), target.get("ingredients_extracted", []))
+
+
 def ingredient_similarity(source_ingredients: list[str], target_ingredients: list[str]) -> float:
     """
     Calculate similarity between two ingredient lists using Jaccard similarity.
@@ -413,11 +660,13 @@ def detect_comfort_level(title: str, instructions: list[str], method: str) -> fl
     Returns:
         Comfort score between 0.0 (light) and 1.0 (very comforting)
     """
-    text = (title + " " + " ".join(instructions)).lower()
-    
-    high_count = sum(1 for kw in COMFORT_KEYWORDS["high_comfort"] if kw in text)
-    medium_count = sum(1 for kw in COMFORT_KEYWORDS["medium_comfort"] if kw in text)
-    light_count = sum(1 for kw in COMFORT_KEYWORDS["light"] if kw in text)
+    return _comfort_from_hits(_keyword_hits((title + " " + " ".join(instructions)).lower()), method)
+
+
+def _comfort_from_hits(hits: frozenset[str], method: str) -> float:
+    high_count = _count_hits(COMFORT_KEYWORD_SETS["high_comfort"], hits)
+    medium_count = _count_hits(COMFORT_KEYWORD_SETS["medium_comfort"], hits)
+    light_count = _count_hits(COMFORT_KEYWORD_SETS["light"], hits)
     
     # Additional boost for slow cooking methods
     if method == "slow_saucy":
@@ -440,11 +689,15 @@ def detect_texture_profile(title: str, instructions: list[str], ingredients: lis
         Dictionary of texture types and their scores
         Example: {"creamy": 0.4, "soft": 0.3, "chunky": 0.3}
     """
-    text = (title + " " + " ".join(instructions) + " " + " ".join(ingredients)).lower()
-    
+    return _texture_from_hits(
+        _keyword_hits((title + " " + " ".join(instructions) + " " + " ".join(ingredients)).lower())
+    )
+
+
+def _texture_from_hits(hits: frozenset[str]) -> dict[str, float]:
     texture_scores = {}
-    for texture, keywords in TEXTURE_KEYWORDS.items():
-        count = sum(1 for kw in keywords if kw in text)
+    for texture, keywords in TEXTURE_KEYWORD_SETS.items():
+        count = _count_hits(keywords, hits)
         if count > 0:
             texture_scores[texture] = count
     
@@ -482,7 +735,7 @@ def calculate_texture_similarity(source_texture: dict, target_texture: dict) ->
     return dot_product / (mag_source * mag_target)
 
 
-def calculate_adaptability(source: dict, target: dict) -> float:
+def calculate_adaptability(source: dict, target: dict, ingredient_sim: float | None = None) -> float:
     """
     Calculate how easy it is to adapt source recipe to target recipe.
     
@@ -492,6 +745,9 @@ def calculate_adaptability(source: dict, target: dict) -> float:
     - Simple techniques = easier (20%)
     - Similar proteins = easier (10%)
     
+    Args:
+        ingredient_sim: Precomputed ingredient Jaccard for this pair (skips recomputing it)
+    
     Returns:
         Adaptability score between 0.0 (hard) and 1.0 (easy)
     """
@@ -502,20 +758,12 @@ def calculate_adaptability(source: dict, target: dict) -> float:
         score += 0.4
     
     # 2. Ingredient overlap (30%)
-    ing_sim = ingredient_similarity(
-        source.get("ingredients_extracted", []),
-        target.get("ingredients_extracted", [])
-    )
+    ing_sim = ingredient_sim if ingredient_sim is not None else _profile_ingredient_similarity(source, target)
     score += 0.3 * ing_sim
     
     # 3. Technique complexity (20%)
     # If both use common techniques, easier to adapt
-    source_inst = " ".join(source.get("instructions", [])).lower()
-    target_inst = " ".join(target.get("instructions", [])).lower()
-    
-    # Count common vs complex techniques
-    common_in_target = sum(1 for kw in ADAPTABILITY_KEYWORDS["common_techniques"] if kw in target_inst)
-    complex_in_target = sum(1 for kw in ADAPTABILITY_KEYWORDS["complex_techniques"] if kw in target_inst)
+    common_in_target, complex_in_target = _technique_counts(target)
     
     if common_in_target > 0:
         technique_score = common_in_target / (common_in_target + complex_in_target + 1)
@@ -532,6 +780,20 @@ def calculate_adaptability(source: dict, target: dict) -> float:
     return min(1.0, score)
 
 
+def _technique_counts(recipe: dict | RecipeProfile) -> tuple[int, int]:
+    """(common, complex) technique keyword counts in the recipe's instructions."""
+    if isinstance(recipe, RecipeProfile):
+        return recipe.common_techniques, recipe.complex_techniques
+    return _technique_counts_from_hits(_keyword_hits(" ".join(recipe.get("instructions", [])).lower()))
+
+
+def _technique_counts_from_hits(hits: frozenset[str]) -> tuple[int, int]:
+    return (
+        _count_hits(ADAPTABILITY_KEYWORD_SETS["common_techniques"], hits),
+        _count_hits(ADAPTABILITY_KEYWORD_SETS["complex_techniques"], hits),
+    )
+
+
 def contains_allergen(ingredients: list[str], excluded: list[str]) -> bool:
     """Check if any ingredient matches excluded allergens."""
     expanded = set()
@@ -545,6 +807,24 @@ def contains_allergen(ingredients: list[str], excluded: list[str]) -> bool:
     return any(exc in ing or ing in exc for ing in ing_lower for exc in expanded)
 
 
+@lru_cache(maxsize=1024)
+def _excluded_title_mask(excluded: tuple[str, ...]) -> int:
+    mask = 0
+    for ing, bit in TITLE_INGREDIENT_BITS.items():
+        if contains_allergen([ing], list(excluded)):
+            mask |= bit
+    return mask
+
+
+def excluded_title_ingredient_mask(excluded: list[str]) -> int:
+    """
+    Bitset over TITLE_INGREDIENT_AXES of the title ingredients contains_allergen
+    would flag for these exclusions. A profile is excluded when
+    profile.title_ingredient_mask & this mask is non-zero.
+    """
+    return _excluded_title_mask(tuple(str(e) for e in excluded))
+
+
 def _pairing_overlap(source_protein: str, target_ingredients: list[str]) -> float:
     """Food pairing overlap using MOCK_FOOD_PAIR."""
     if source_protein != "chicken":
@@ -555,6 +835,143 @@ def _pairing_overlap(source_protein: str, target_ingredients: list[str]) -> floa
     return min(1.0, matches / max(1, len(MOCK_FOOD_PAIR["topSimilarEntities"])))
 
 
+# === RECIPE PROFILES ===
+
+@dataclass(frozen=True, slots=True)
+class RecipeProfile:
+    """
+    Immutable per-recipe features used for scoring.
+    Supports .get() so scoring code accepts profiles and plain dicts alike.
+    """
+    title: str
+    method: str
+    protein: str
+    flavor_vector: Mapping[str, float]
+    ingredients: tuple[str, ...]  # Inferred from title (allergen check)
+    ingredients_extracted: tuple[str, ...]  # Matched in instructions
+    ingredient_mask: int  # ingredients_extracted as a bitset over INGREDIENT_AXES
+    title_ingredient_mask: int  # ingredients as a bitset over TITLE_INGREDIENT_AXES
+    instructions: tuple[str, ...]
+    comfort_level: float
+    texture_profile: Mapping[str, float]
+    common_techniques: int
+    complex_techniques: int
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+PROFILE_CACHE = TTLCache("recipe_profiles", maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "8192")), ttl=float("inf"))
+_MAX_KEYWORD_LEN = max(len(kw) for kw in KEYWORD_AUTOMATON.keywords)
+
+
+def _profile_cache_key(recipe_id: str, title: str, instructions: list[str]) -> tuple[str, str]:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(title.encode("utf-8", "surrogatepass"))
+    for step in instructions:
+        digest.update(b"\x1f")
+        digest.update(str(step).encode("utf-8", "surrogatepass"))
+    return (str(recipe_id), digest.hexdigest())
+
+
+def _title_ingredient_mask(ingredients: list[str]) -> int:
+    mask = 0
+    for ing in ingredients:
+        mask |= TITLE_INGREDIENT_BITS[ing]
+    return mask
+
+
+def _junction_hits(left: str, right: str, whole_right: bool = False) -> frozenset[str]:
+    """
+    Keywords occurring in left + " " + right that span the join. Any such match
+    starts within the last _MAX_KEYWORD_LEN - 1 chars of left and (unless
+    whole_right) ends within the first _MAX_KEYWORD_LEN - 1 chars of right.
+    """
+    n = _MAX_KEYWORD_LEN - 1
+    return _keyword_hits(left[-n:] + " " + (right if whole_right else right[:n]))
+
+
+def build_recipe_profile(title: str, instructions: list[str], recipe_id: str = "") -> RecipeProfile:
+    """
+    Compute every scoring feature for a recipe, normalizing its text only once.
+
+    The title and the joined instructions are lowercased once and each scanned
+    once by KEYWORD_AUTOMATON. Hits for the combined texts the detectors use are
+    unions of those plus a scan of the few characters around each join, so the
+    features match the standalone detect_* functions exactly. Results are
+    memoized by (Recipe_id, content hash), so a recipe that keeps showing up as
+    a candidate is only profiled once.
+    """
+    key = _profile_cache_key(recipe_id, title, instructions)
+    cached = PROFILE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    title_l = title.lower()
+    inst_l = " ".join(instructions).lower()
+    title_hits = _keyword_hits(title_l)
+    inst_hits = _keyword_hits(inst_l)
+    # Hits for title + " " + instructions (the text detect_comfort_level scans)
+    text_hits = title_hits | inst_hits | _junction_hits(title_l, inst_l)
+
+    ingredients_extracted = _ingredients_from_hits(inst_hits)
+    method = _method_from_hits(inst_hits)
+
+    # ... + " " + extracted ingredients (the text detect_texture_profile scans)
+    texture_hits = text_hits
+    if ingredients_extracted:
+        texture_hits = text_hits | _junction_hits(title_l + " " + inst_l, " ".join(ingredients_extracted), whole_right=True)
+
+    title_ingredients = _title_ingredients_from_hits(title_hits)
+    common_techniques, complex_techniques = _technique_counts_from_hits(inst_hits)
+    profile = RecipeProfile(
+        title=title,
+        method=method,
+        protein=_protein_from_hits(title_hits),
+        flavor_vector=MappingProxyType(_flavor_from_hits(title_hits, method)),
+        ingredients=tuple(title_ingredients),
+        ingredients_extracted=tuple(ingredients_extracted),
+        ingredient_mask=ingredient_mask(ingredients_extracted),
+        title_ingredient_mask=_title_ingredient_mask(title_ingredients),
+        instructions=tuple(instructions),
+        comfort_level=_comfort_from_hits(text_hits, method),
+        texture_profile=MappingProxyType(_texture_from_hits(texture_hits)),
+        common_techniques=common_techniques,
+        complex_techniques=complex_techniques,
+    )
+    PROFILE_CACHE.set(key, profile)
+    return profile
+
+
+def _score_components(source: dict, target: dict) -> tuple[float, float, float, float, float, float]:
+    """(score, method_ok, flavor_sim, ingredient_sim, protein_ok, pairing) - the weighted part of score_recipe."""
+    method_w = 0.30
+    flavor_w = 0.25
+    ingredient_w = 0.25
+    protein_w = 0.10
+    pairing_w = 0.10
+
+    src_m, tgt_m = source.get("method", ""), target.get("method", "")
+    method_ok = 1.0 if src_m and src_m == tgt_m else 0.0
+    flavor_sim = flavor_similarity(source.get("flavor_vector", {}), target.get("flavor_vector", {}))
+    ingredient_sim = _profile_ingredient_similarity(source, target)
+    src_p, tgt_p = source.get("protein", ""), target.get("protein", "")
+    protein_ok = 1.0 if src_p and src_p == tgt_p else 0.0
+    pairing = _pairing_overlap(src_p, target.get("ingredients_extracted", []))
+
+    score = (method_w * method_ok + 
+             flavor_w * flavor_sim + 
+             ingredient_w * ingredient_sim +
+             protein_w * protein_ok + 
+             pairing_w * pairing)
+    return score, method_ok, flavor_sim, ingredient_sim, protein_ok, pairing
+
+
+def match_score(source: dict, target: dict) -> float:
+    """Weighted score only - same value as score_recipe(...)[0], without building reasons or metrics."""
+    return _score_components(source, target)[0]
+
+
 def score_recipe(source: dict, target: dict) -> tuple[float, list[str], dict]:
     """
     Score target vs source recipe.
@@ -577,42 +994,34 @@ def score_recipe(source: dict, target: dict) -> tuple[float, list[str], dict]:
         - ingredient_match: 0-100%
     """
     reasons = []
-    method_w = 0.30
-    flavor_w = 0.25
-    ingredient_w = 0.25
-    protein_w = 0.10
-    pairing_w = 0.10
+    score, method_ok, flavor_sim, ingredient_sim, protein_ok, pairing = _score_components(source, target)
 
     # 1. Cooking Method Similarity (30%)
     src_m, tgt_m = source.get("method", ""), target.get("method", "")
-    method_ok = 1.0 if src_m and src_m == tgt_m else 0.0
     if method_ok:
         reasons.append(f"✓ Same cooking method: {tgt_m}")
     else:
         reasons.append(f"Cooking style: {tgt_m} vs {src_m}")
 
     # 2. Flavor Profile Similarity (25%)
-    flavor_sim = flavor_similarity(source.get("flavor_vector", {}), target.get("flavor_vector", {}))
     if flavor_sim >= 0.6:
         reasons.append(f"✓ Similar flavor profile (score: {flavor_sim:.2f})")
     else:
         reasons.append(f"Flavor similarity: {flavor_sim:.2f}")
 
     # 3. Ingredient Similarity (25%)
-    ingredient_sim = ingredient_similarity(
-        source.get("ingredients_extracted", []), 
-        target.get("ingredients_extracted", [])
-    )
     if ingredient_sim >= 0.3:
-        common = set(source.get("ingredients_extracted", [])) & set(target.get("ingredients_extracted", []))
-        common_list = sorted(list(common))[:3]  # Show top 3
+        if isinstance(source, RecipeProfile) and isinstance(target, RecipeProfile):
+            common_list = decode_ingredient_mask(source.ingredient_mask & target.ingredient_mask)[:3]  # Show top 3
+        else:
+            common = set(source.get("ingredients_extracted", [])) & set(target.get("ingredients_extracted", []))
+            common_list = sorted(list(common))[:3]  # Show top 3
         reasons.append(f"✓ Shared ingredients: {', '.join(common_list)}")
     else:
         reasons.append(f"Ingredient overlap: {ingredient_sim:.2f}")
 
     # 4. Protein Type Match (10%)
     src_p, tgt_p = source.get("protein", ""), target.get("protein", "")
-    protein_ok = 1.0 if src_p and src_p == tgt_p else 0.0
     if protein_ok:
         reasons.append(f"✓ Same protein: {tgt_p}")
     else:
@@ -620,16 +1029,8 @@ def score_recipe(source: dict, target: dict) -> tuple[float, list[str], dict]:
             reasons.append(f"Protein: {tgt_p} vs {src_p}")
 
     # 5. Food Pairing Overlap (10%)
-    pairing = _pairing_overlap(src_p, target.get("ingredients_extracted", []))
     if pairing >= 0.5:
         reasons.append("✓ Good food pairing compatibility")
-
-    # Calculate weighted score
-    score = (method_w * method_ok + 
-             flavor_w * flavor_sim + 
-             ingredient_w * ingredient_sim +
-             protein_w * protein_ok + 
-             pairing_w * pairing)
     
     # ===== CALCULATE DETAILED METRICS FOR FRONTEND =====
     
@@ -645,7 +1046,7 @@ def score_recipe(source: dict, target: dict) -> tuple[float, list[str], dict]:
     )
     
     # Adaptability (how easy to adapt from source to target)
-    adaptability = calculate_adaptability(source, target)
+    adaptability = calculate_adaptability(source, target, ingredient_sim)
     
     # Detailed metrics dictionary (all as percentages 0-100)
     detailed_metrics = {
@@ -659,111 +1060,355 @@ def score_recipe(source: dict, target: dict) -> tuple[float, list[str], dict]:
     return (score, reasons, detailed_metrics)
 
 
-def recommend_recipes(
-    source_recipe_title: str,
-    target_cuisine: str,
-    excluded_allergens: list[str] | None = None,
-) -> dict:
+def _build_source_profile(source_recipe_title: str) -> RecipeProfile:
     """
-    Recommend target-cuisine recipes similar to source dish.
-    ALWAYS returns at least some recommendations from the target region.
+    Source branch of the pipeline: title lookup, then instructions, then feature extraction.
+    Independent of the target cuisine, so it can run alongside the region fetch.
     """
-    excluded_allergens = excluded_allergens or []
+    # Step 1: Fetch source recipe from API
+    with metrics.timed("title_lookup"):
+        source_recipe_data = fetch_recipe_by_title(source_recipe_title)
+    recipe_id = source_recipe_data.get("Recipe_id", "") if source_recipe_data else ""
+    with metrics.timed("instructions"):
+        src_inst = fetch_recipe_instructions(recipe_id) if recipe_id else []
+    with metrics.timed("source_features"):
+        return _source_profile_from(source_recipe_title, source_recipe_data, src_inst)
 
-    print(f"\n{'='*60}")
-    print(f"🎯 RECOMMENDATION REQUEST")
-    print(f"{'='*60}")
-    print(f"Source Dish: {source_recipe_title}")
-    print(f"Target Cuisine: {target_cuisine}")
-    print(f"Excluded Allergens: {excluded_allergens}")
-    print(f"{'='*60}")
 
-    # Step 1: Fetch source recipe from API
-    source_recipe_data = fetch_recipe_by_title(source_recipe_title)
-    
+def _source_profile_from(source_recipe_title: str, source_recipe_data: dict | None, src_inst: list[str]) -> RecipeProfile:
+    """Feature extraction for the source dish from already-fetched recipe data and instructions."""
     if not source_recipe_data:
         # Fallback if recipe not found
-        print(f"\n⚠️  Source recipe not found in API, using fallback analysis")
+        logger.warning("Source recipe %r not found in API, using fallback analysis", source_recipe_title)
         src_inst = ["simmer", "cook"]
         src_method = detect_cooking_method(src_inst)
-        src_protein = detect_protein(source_recipe_title)
-        src_flavor = _infer_flavor_style(source_recipe_title, src_method)
+        common_techniques, complex_techniques = _technique_counts({"instructions": src_inst})
         src_ingredients = _get_ingredients_from_title(source_recipe_title)
-        src_comfort = 0.5
-        src_texture = {}
-        src_ingredients_extracted = []  # No instructions to extract from
+        source_profile = RecipeProfile(
+            title=source_recipe_title,
+            method=src_method,
+            protein=detect_protein(source_recipe_title),
+            flavor_vector=MappingProxyType(_infer_flavor_style(source_recipe_title, src_method)),
+            ingredients=tuple(src_ingredients),
+            ingredients_extracted=(),  # No instructions to extract from
+            ingredient_mask=0,
+            title_ingredient_mask=_title_ingredient_mask(src_ingredients),
+            instructions=tuple(src_inst),
+            comfort_level=0.5,
+            texture_profile=MappingProxyType({}),
+            common_techniques=common_techniques,
+            complex_techniques=complex_techniques,
+        )
     else:
-        # Get instructions for source recipe
-        recipe_id = source_recipe_data.get("Recipe_id", "")
-        src_inst = fetch_recipe_instructions(recipe_id) if recipe_id else []
-        
         # If no instructions from API, try parsing Processes field
         if not src_inst and "Processes" in source_recipe_data:
             src_inst = _parse_processes(source_recipe_data.get("Processes", ""))
-            print(f"\n📝 Using Processes field: {len(src_inst)} steps")
+            logger.debug("Using Processes field: %d steps", len(src_inst))
         
         if not src_inst:
             src_inst = ["cook"]
-            print(f"\n⚠️  No instructions available, using default")
+            logger.info("No instructions available for %r, using default", source_recipe_title)
         
-        # EXTRACT INGREDIENTS FROM INSTRUCTIONS
-        src_ingredients_extracted = extract_ingredients_from_instructions(src_inst)
-        print(f"\n🥘 Extracted {len(src_ingredients_extracted)} ingredients from instructions:")
-        if src_ingredients_extracted:
-            print(f"   {', '.join(src_ingredients_extracted[:10])}")
-            if len(src_ingredients_extracted) > 10:
-                print(f"   ... and {len(src_ingredients_extracted) - 10} more")
-        
-        src_method = detect_cooking_method(src_inst)
         src_title = source_recipe_data.get("Recipe_title", source_recipe_title)
-        src_protein = detect_protein(src_title)
-        src_flavor = _infer_flavor_style(src_title, src_method)
-        src_ingredients = _get_ingredients_from_title(src_title)
-        
-        # Calculate comfort level and texture profile
-        src_comfort = detect_comfort_level(src_title, src_inst, src_method)
-        src_texture = detect_texture_profile(src_title, src_inst, src_ingredients_extracted)
-
-    source_profile = {
-        "method": src_method,
-        "flavor_vector": src_flavor,
-        "protein": src_protein,
-        "ingredients": src_ingredients,
-        "ingredients_extracted": src_ingredients_extracted,
-        "instructions": src_inst,  # Store for adaptability calculation
-        "comfort_level": src_comfort,
-        "texture_profile": src_texture,
+        source_profile = build_recipe_profile(src_title, src_inst, source_recipe_data.get("Recipe_id", ""))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        _log_source_profile(source_profile)
+    return source_profile
+
+
+def _log_source_profile(profile: RecipeProfile) -> None:
+    texture = {k: round(v * 100) for k, v in list(profile.texture_profile.items())[:3]}
+    logger.debug(
+        "Source profile %r: method=%s protein=%s comfort=%.0f%% flavor=%s texture=%s "
+        "title_ingredients=%s extracted=%d %s",
+        profile.title, profile.method, profile.protein or "none", profile.comfort_level * 100,
+        dict(profile.flavor_vector), texture, list(profile.ingredients),
+        len(profile.ingredients_extracted), list(profile.ingredients_extracted[:8]),
+    )
+
+
+def _log_request(source_recipe_title: str, target_cuisine: str, excluded_allergens: list[str]) -> None:
+    logger.info("Recommendation request: source=%r target=%r excluded=%s",
+                source_recipe_title, target_cuisine, excluded_allergens)
+
+
+def recommend_recipes(
+    source_recipe_title: str,
+    target_cuisine: str,
+    excluded_allergens: list[str] | None = None,
+    top_k: int | None = None,
+) -> dict:
+    """
+    Recommend target-cuisine recipes similar to source dish.
+    ALWAYS returns at least some recommendations from the target region.
+    
+    Args:
+        top_k: Number of recommendations to return (DEFAULT_TOP_K if None, capped at MAX_TOP_K)
+    """
+    for stage, payload in recommend_recipes_stages(source_recipe_title, target_cuisine, excluded_allergens, top_k):
+        if stage == "final":
+            return payload
+    raise RuntimeError("recommendation finished without a final stage")
+
+
+def recommend_recipes_stages(
+    source_recipe_title: str,
+    target_cuisine: str,
+    excluded_allergens: list[str] | None = None,
+    top_k: int | None = None,
+) -> Iterator[tuple[str, Any]]:
+    """
+    recommend_recipes as a generator of (stage, payload) pairs, in order:
+    "source_profile" (profile summary), "candidates" (count and titles),
+    "provisional" (cheap top-k scores, skipped when nothing scored) and
+    "final" (the recommendations recommend_recipes returns).
+    """
+    excluded_allergens = excluded_allergens or []
+    _log_request(source_recipe_title, target_cuisine, excluded_allergens)
+
+    # The region fetch doesn't depend on the source recipe, so start it now and
+    # run the source branch (title -> instructions -> features) on this thread.
+    # A cached region list, or a saturated fetch pool, means it's read inline.
+    target_future = None
+    if REGION_CACHE.peek(_region_cache_key(target_cuisine, "", CANDIDATE_LIMIT)) is MISSING:
+        target_future = _start_fetch(_timed_region_fetch, target_cuisine, limit=CANDIDATE_LIMIT)
+    source_profile = _build_source_profile(source_recipe_title)
+    yield "source_profile", profile_summary(source_profile)
+
+    # Step 2: Collect target cuisine recipes (fetched concurrently above)
+    if target_future is not None:
+        target_recipes = target_future.result()
+    else:
+        target_recipes = _timed_region_fetch(target_cuisine, limit=CANDIDATE_LIMIT)
+    yield "candidates", {
+        "count": len(target_recipes),
+        "titles": [r.get("Recipe_title", "Unknown") for r in target_recipes],
     }
+    yield from _rank_stages(source_profile, target_recipes, target_cuisine, excluded_allergens, top_k)
+
+
+def _start_fetch(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future | None:
+    """
+    Run fn on the shared fetch pool in a copy of the caller's context, so its stage
+    and upstream timings land in the caller's request (pool threads don't inherit
+    contextvars). None if every worker is busy: the caller should run fn itself
+    rather than wait in the pool's queue.
+    """
+    if not _fetch_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _submit_fetch(_FETCH_EXECUTOR, fn, *args, **kwargs)
+    except BaseException:
+        _fetch_slots.release()
+        raise
+    future.add_done_callback(lambda _: _fetch_slots.release())
+    return future
+
+
+def _submit_fetch(pool: ThreadPoolExecutor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """pool.submit in a copy of the caller's context (see _start_fetch)."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _timed_region_fetch(*args: Any, **kwargs: Any) -> list[dict]:
+    """fetch_recipes_by_region under the "region_fetch" timer."""
+    with metrics.timed("region_fetch"):
+        return fetch_recipes_by_region(*args, **kwargs)
+
+
+def profile_summary(profile: RecipeProfile) -> dict:
+    """JSON-ready view of a profile's user-facing features."""
+    return {
+        "title": profile.title,
+        "method": profile.method,
+        "protein": profile.protein,
+        "comfort_level": profile.comfort_level,
+        "flavor_vector": dict(profile.flavor_vector),
+        "texture_profile": dict(profile.texture_profile),
+        "ingredients": list(profile.ingredients),
+        "ingredients_extracted": list(profile.ingredients_extracted),
+    }
+
+
+def recommend_recipes_batch(requests: list[dict]) -> list[list[dict] | Exception]:
+    """
+    Many recommendations at once with shared work: every distinct target cuisine
+    is fetched and packed into one CandidateBatch, every distinct source dish is
+    fetched and profiled once, and all of those fetches run concurrently on a
+    pool of the batch's own (at most FETCH_WORKERS wide, so a big batch can't
+    crowd out other requests). Each item is then one vectorized pass over its
+    cuisine's batch.
+
+    Args:
+        requests: [{"source": str, "target": str, "excluded": [...], "top_k": int | None}, ...]
+
+    Returns:
+        One entry per request, in input order: its recommendations, or the exception it raised
+    """
+    targets = {_region_cache_key(req["target"], "", CANDIDATE_LIMIT): req["target"] for req in requests}
+    sources = {_title_cache_key(req["source"]): req["source"] for req in requests}
+    logger.info("Batch of %d recommendations: %d distinct sources, %d distinct cuisines",
+                len(requests), len(sources), len(targets))
+
+    workers = max(1, min(FETCH_WORKERS, len(targets) + len(sources)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-fetch") as pool:
+        region_futures = {key: _submit_fetch(pool, _timed_region_fetch, target, limit=CANDIDATE_LIMIT)
+                          for key, target in targets.items()}
+        source_futures = {key: _submit_fetch(pool, _build_source_profile, source) for key, source in sources.items()}
+
+        batches: dict[tuple, tuple[list[dict], batch_scoring.CandidateBatch]] = {}
+        results: list[list[dict] | Exception] = []
+        for req in requests:
+            try:
+                region_key = _region_cache_key(req["target"], "", CANDIDATE_LIMIT)
+                if region_key not in batches:
+                    recipes = region_futures[region_key].result()
+                    with metrics.timed("target_features"):
+                        batches[region_key] = (recipes, _candidate_batch(recipes))
+                target_recipes, batch = batches[region_key]
+                source_profile = source_futures[_title_cache_key(req["source"])].result()
+                results.append(_rank_target_recipes(
+                    source_profile, target_recipes, req["target"], req.get("excluded") or [],
+                    req.get("top_k"), batch,
+                ))
+            except Exception as e:
+                logger.exception("Batch item %r -> %r failed", req.get("source"), req.get("target"))
+                results.append(e)
+    return results
+
+
+def recommendation_dependencies(source_recipe_title: str, target_cuisine: str) -> list[tuple[TTLCache, Any]] | None:
+    """
+    The (cache, key) entries a recommend_recipes result for these inputs was built from.
+    None if one of them isn't cached (e.g. the fetch failed), so the result shouldn't be reused.
+    """
+    title_key = _title_cache_key(source_recipe_title)
+    region_key = _region_cache_key(target_cuisine, "", CANDIDATE_LIMIT)
+    source = RECIPE_CACHE.peek(title_key)
+    if source is MISSING or REGION_CACHE.peek(region_key) is MISSING:
+        return None
 
-    print(f"\n{'─'*60}")
-    print(f"📊 SOURCE PROFILE ANALYSIS")
-    print(f"{'─'*60}")
-    print(f"Cooking Method: {src_method}")
-    print(f"Protein Type: {src_protein or 'None detected'}")
-    print(f"Comfort Level: {source_profile.get('comfort_level', 0) * 100:.0f}%")
-    print(f"Flavor Vector: {src_flavor}")
-    if source_profile.get('texture_profile'):
-        texture_str = ', '.join([f"{k}: {v*100:.0f}%" for k, v in list(source_profile['texture_profile'].items())[:3]])
-        print(f"Texture Profile: {texture_str}")
-    print(f"Ingredients (from title): {src_ingredients}")
-    print(f"Ingredients (extracted): {len(source_profile.get('ingredients_extracted', []))} found")
-    if source_profile.get('ingredients_extracted'):
-        ing_list = source_profile['ingredients_extracted'][:8]
-        print(f"  Top ingredients: {', '.join(ing_list)}")
-        if len(source_profile['ingredients_extracted']) > 8:
-            print(f"  ... and {len(source_profile['ingredients_extracted']) - 8} more")
-
-    # Step 2: Fetch target cuisine recipes from API
-    target_recipes = fetch_recipes_by_region(target_cuisine, limit=10)
+    deps = [(RECIPE_CACHE, title_key), (REGION_CACHE, region_key)]
+    recipe_id = source.get("Recipe_id", "") if source else ""
+    if recipe_id:
+        if INSTRUCTIONS_CACHE.peek(str(recipe_id)) is MISSING:
+            return None
+        deps.append((INSTRUCTIONS_CACHE, str(recipe_id)))
+    return deps
+
+
+def resolve_top_k(top_k: int | None) -> int:
+    """Per-request top_k, defaulting to DEFAULT_TOP_K and clamped to 1..MAX_TOP_K."""
+    if top_k is None:
+        top_k = DEFAULT_TOP_K
+    return max(1, min(int(top_k), MAX_TOP_K))
+
+
+def _target_profile(recipe: dict) -> RecipeProfile:
+    """Profile a candidate from its region-listing entry (Processes field, no extra fetch)."""
+    # Try to get instructions from API (but don't fetch for every recipe - too slow)
+    # Instead, use Processes field if available
+    tgt_inst = []
+    if "Processes" in recipe:
+        tgt_inst = _parse_processes(recipe.get("Processes", ""))
     
+    if not tgt_inst:
+        tgt_inst = ["cook"]
+
+    return build_recipe_profile(recipe.get("Recipe_title", ""), tgt_inst, recipe.get("Recipe_id", ""))
+
+
+def pack_candidates(profiles: list[RecipeProfile]) -> batch_scoring.CandidateBatch:
+    """Candidate profiles packed for batch_scoring against this module's texture and pairing tables."""
+    return batch_scoring.CandidateBatch.from_profiles(
+        profiles, tuple(TEXTURE_KEYWORDS), lambda ingredients: _pairing_overlap("chicken", ingredients)
+    )
+
+
+def _candidate_batch(recipes: list[dict]) -> batch_scoring.CandidateBatch:
+    """Packed batch for a candidate list (memoized by batch_scoring.batch_for)."""
+    return batch_scoring.batch_for(recipes, lambda rs: pack_candidates([_target_profile(r) for r in rs]))
+
+
+def _rank_target_recipes(
+    source_profile: RecipeProfile,
+    target_recipes: list[dict],
+    target_cuisine: str,
+    excluded_allergens: list[str],
+    top_k: int | None = None,
+    candidate_batch: batch_scoring.CandidateBatch | None = None,
+) -> list[dict]:
+    """
+    Filter, profile and score target recipes against the source profile. Pure CPU, no I/O.
+    Every candidate gets the cheap weighted score (one at a time, or vectorized for
+    large pools); only the best top_k get reasons and detailed metrics.
+
+    Args:
+        candidate_batch: target_recipes already packed by _candidate_batch, to score against
+    """
+    for stage, payload in _rank_stages(source_profile, target_recipes, target_cuisine,
+                                       excluded_allergens, top_k, candidate_batch):
+        if stage == "final":
+            return payload
+    raise RuntimeError("ranking finished without a final stage")
+
+
+def _top_looped(
+    source_profile: RecipeProfile,
+    target_recipes: list[dict],
+    excluded_mask: int,
+    top_k: int,
+) -> tuple[list[tuple], int]:
+    """Best top_k (score, title, recipe, profile) by scoring one candidate at a time. Returns (top, scored count)."""
+    with metrics.timed("target_features"):
+        target_profiles = [_target_profile(recipe) for recipe in target_recipes]
+
+    candidates = []
+    with metrics.timed("scoring"):
+        for recipe, target_profile in zip(target_recipes, target_profiles):
+            # Skip if contains allergens
+            if target_profile.title_ingredient_mask & excluded_mask:
+                continue
+            candidates.append((match_score(source_profile, target_profile), recipe.get("Recipe_title", ""),
+                               recipe, target_profile))
+
+        # Keep the best top_k (nlargest is stable, so ties keep region order like a full sort)
+        top = heapq.nlargest(top_k, candidates, key=lambda c: c[0])
+    return top, len(candidates)
+
+
+def _top_batched(
+    source_profile: RecipeProfile,
+    target_recipes: list[dict],
+    excluded_mask: int,
+    top_k: int,
+    batch: batch_scoring.CandidateBatch | None = None,
+) -> tuple[list[tuple], int]:
+    """_top_looped for large pools: the whole pool is scored with batch_scoring in a few NumPy ops."""
+    if batch is None:
+        with metrics.timed("target_features"):
+            batch = _candidate_batch(target_recipes)
+    with metrics.timed("scoring"):
+        ranked, scored_count = batch_scoring.top_candidates(source_profile, batch, excluded_mask, top_k)
+    top = [(score, target_recipes[i].get("Recipe_title", ""), target_recipes[i], batch.profiles[i])
+           for score, i in ranked]
+    return top, scored_count
+
+
+def _rank_stages(
+    source_profile: RecipeProfile,
+    target_recipes: list[dict],
+    target_cuisine: str,
+    excluded_allergens: list[str],
+    top_k: int | None = None,
+    candidate_batch: batch_scoring.CandidateBatch | None = None,
+) -> Iterator[tuple[str, Any]]:
+    """_rank_target_recipes as stages: ("provisional", [{recipe_title, score}]) when anything scored, then ("final", matches)."""
+    top_k = resolve_top_k(top_k)
     if not target_recipes:
-        print(f"\n❌ No recipes found for {target_cuisine}")
-        print(f"\n💡 Tips:")
-        print(f"   • Try simpler region names: 'Chinese' instead of 'Chinese and Mongolian'")
-        print(f"   • Check spelling and capitalization")
-        print(f"   • Try these common regions: Italian, Chinese, Mexican, Indian, French, Greek")
-        
-        return [{
+        logger.warning("No recipes found for target cuisine %r", target_cuisine)
+        yield "final", [{
             "recipe_title": f"No recipes found for '{target_cuisine}'",
             "final_score": 0.0,
             "explanation": [
@@ -773,97 +1418,40 @@ def recommend_recipes(
             ],
             "no_match_fallback": True,
         }]
-
-    print(f"\n{'─'*60}")
-    print(f"🔍 SCORING {len(target_recipes)} RECIPES")
-    print(f"{'─'*60}")
+        return
 
     # Step 3: Filter by allergens and score each recipe
-    scored = []
-    filtered_count = 0
-    
-    for idx, recipe in enumerate(target_recipes):
-        title = recipe.get("Recipe_title", "")
-        tgt_ingredients = _get_ingredients_from_title(title)
-        
-        # Skip if contains allergens
-        if contains_allergen(tgt_ingredients, excluded_allergens):
-            filtered_count += 1
-            continue
-        
-        # Get instructions
-        recipe_id = recipe.get("Recipe_id", "")
-        tgt_inst = []
-        
-        # Try to get instructions from API (but don't fetch for every recipe - too slow)
-        # Instead, use Processes field if available
-        if "Processes" in recipe:
-            tgt_inst = _parse_processes(recipe.get("Processes", ""))
-        
-        if not tgt_inst:
-            tgt_inst = ["cook"]
-        
-        # EXTRACT INGREDIENTS FROM TARGET RECIPE INSTRUCTIONS
-        tgt_ingredients_extracted = extract_ingredients_from_instructions(tgt_inst)
-        
-        tgt_method = detect_cooking_method(tgt_inst)
-        tgt_protein = detect_protein(title)
-        tgt_flavor = _infer_flavor_style(title, tgt_method)
-        
-        # Calculate comfort level and texture profile for target
-        tgt_comfort = detect_comfort_level(title, tgt_inst, tgt_method)
-        tgt_texture = detect_texture_profile(title, tgt_inst, tgt_ingredients_extracted)
-
-        target_profile = {
-            "method": tgt_method,
-            "flavor_vector": tgt_flavor,
-            "protein": tgt_protein,
-            "ingredients": tgt_ingredients,
-            "ingredients_extracted": tgt_ingredients_extracted,
-            "instructions": tgt_inst,  # For adaptability calculation
-            "comfort_level": tgt_comfort,
-            "texture_profile": tgt_texture,
-        }
-
-        score, reasons, detailed_metrics = score_recipe(source_profile, target_profile)
-        scored.append((score, {"Recipe_title": title, "recipe": recipe, "metrics": detailed_metrics}, reasons))
+    excluded_mask = excluded_title_ingredient_mask(excluded_allergens)
+    if candidate_batch is not None or len(target_recipes) >= batch_scoring.BATCH_SCORING_MIN_CANDIDATES:
+        top, scored_count = _top_batched(source_profile, target_recipes, excluded_mask, top_k, candidate_batch)
+    else:
+        top, scored_count = _top_looped(source_profile, target_recipes, excluded_mask, top_k)
+    filtered_count = len(target_recipes) - scored_count
+    metrics.CANDIDATES_SCORED.inc(scored_count)
+    metrics.CANDIDATES_FILTERED.inc(filtered_count)
 
-    if filtered_count > 0:
-        print(f"🚫 Filtered out {filtered_count} recipes due to allergens")
-    
-    print(f"✅ Scored {len(scored)} recipes")
+    logger.debug("Scored %d of %d recipes (%d filtered for allergens)",
+                 scored_count, len(target_recipes), filtered_count)
 
-    # Sort by score
-    scored.sort(key=lambda x: -x[0])
-    
-    print(f"\n{'─'*60}")
-    print(f"🏆 TOP SCORING RECIPES")
-    print(f"{'─'*60}")
-    
-    # Show top 10 scores for debugging
-    for i, (score, data, reasons) in enumerate(scored[:10], 1):
-        print(f"{i}. {data['Recipe_title']}")
-        print(f"   Overall Score: {score:.3f}")
-        
-        # Show detailed metrics if available
-        if "metrics" in data:
-            metrics = data["metrics"]
-            print(f"   📊 Metrics:")
-            print(f"      Comfort: {metrics.get('comfort_similarity', 0):.0f}% | "
-                  f"Flavor: {metrics.get('flavor_similarity', 0):.0f}% | "
-                  f"Adaptability: {metrics.get('adaptability', 0):.0f}%")
-            print(f"      Texture: {metrics.get('texture_alignment', 0):.0f}% | "
-                  f"Ingredients: {metrics.get('ingredient_match', 0):.0f}%")
-        
-        print(f"   {reasons[0] if reasons else 'No explanation'}")
+    if top:
+        yield "provisional", [{"recipe_title": title, "score": round(score, 3)} for score, title, _, _ in top]
+    scored = []
+    with metrics.timed("explain"):
+        for score, title, recipe, target_profile in top:
+            _, reasons, detailed_metrics = score_recipe(source_profile, target_profile)
+            scored.append((score, {"Recipe_title": title, "recipe": recipe, "metrics": detailed_metrics}, reasons))
     
-    # ALWAYS return at least 3 recipes
-    top_count = min(3, len(scored))
+    # Show the selected scores for debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, (score, data, reasons) in enumerate(scored, 1):
+            logger.debug("#%d %r score=%.3f metrics=%s %s", i, data["Recipe_title"], score,
+                         data["metrics"], reasons[0] if reasons else "No explanation")
     
+    # ALWAYS return at least some recipes
     if len(scored) == 0:
-        # No recipes passed allergen filter - return top 3 from original list
-        print(f"\n⚠️  No recipes passed filters, showing top 3 from region anyway")
-        return [
+        # No recipes passed allergen filter - return top_k from original list
+        logger.info("No recipes passed allergen filters, showing top %d from region anyway", top_k)
+        yield "final", [
             {
                 "recipe_title": r.get("Recipe_title", "Unknown"),
                 "final_score": 0.0,
@@ -875,8 +1463,9 @@ def recommend_recipes(
                 "prep_time": r.get("prep_time", ""),
                 "servings": r.get("servings", ""),
             }
-            for r in target_recipes[:3]
+            for r in target_recipes[:top_k]
         ]
+        return
     
     # Build results
     matches = [
@@ -898,21 +1487,19 @@ def recommend_recipes(
                 "ingredient_match": 0.0,
             }),
         }
-        for s in scored[:top_count]
+        for s in scored
     ]
 
     # Check if scores are very low (less than 0.2)
     if matches and matches[0]["final_score"] < 0.2:
-        print(f"\n⚠️  Low match scores detected (best: {matches[0]['final_score']:.3f})")
-        print(f"   Still showing top {len(matches)} recipes from the region")
+        logger.info("Low match scores (best %.3f), still showing top %d from the region",
+                    matches[0]["final_score"], len(matches))
         for m in matches:
             m["explanation"].insert(0, "⚠️ Low similarity - but this is a popular dish in the region")
-    
-    print(f"\n{'='*60}")
-    print(f"✅ RETURNING {len(matches)} RECOMMENDATIONS")
-    print(f"{'='*60}\n")
 
-    return matches
+    logger.info("Returning %d recommendations for %r (best %.3f)",
+                len(matches), target_cuisine, matches[0]["final_score"])
+    yield "final", matches
 
 
-recommend_recipes_new = recommend_recipes
\ No newline at end of file
+recommend_recipes_new = recommend_recipes
@@ -0,0 +1,138 @@
+"""
+FlavorBridge async pipeline - asyncio-native counterpart of flavor_bridge.
+Upstream calls go through upstream.aget (httpx), so many in-flight
+recommendations multiplex over one event loop instead of one blocked
+thread each. Request building, response parsing, caches and scoring are
+shared with the sync module.
+"""
+
+from __future__ import annotations
+import asyncio
+
+import metrics
+import upstream
+import flavor_bridge as fb
+from cache import MISSING
+from singleflight import AsyncSingleFlight
+
+# Concurrent misses for the same key on this loop share one upstream request
+RECIPE_FLIGHT = AsyncSingleFlight("recipe_by_title_async")
+INSTRUCTIONS_FLIGHT = AsyncSingleFlight("instructions_async")
+REGION_FLIGHT = AsyncSingleFlight("recipes_by_region_async")
+
+
+async def fetch_recipe_by_title(title: str) -> dict | None:
+    """Async fetch_recipe_by_title. Shares RECIPE_CACHE with the sync version."""
+    key = fb._title_cache_key(title)
+    cached = fb.RECIPE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def load() -> dict | None:
+        # Re-check: a flight for this key may have finished since the miss above
+        cached = fb.RECIPE_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        url, params = fb._recipe_by_title_request(title)
+        recipe = fb._parse_recipe_by_title(await upstream.aget(url, params=params, headers=fb.API_HEADERS))
+        fb.RECIPE_CACHE.set(key, recipe, negative=recipe is None)
+        return recipe
+
+    try:
+        return await RECIPE_FLIGHT.do(key, load)
+    except Exception as e:
+        fb.logger.error("Error fetching recipe by title %r: %s", title, e)
+        return None
+
+
+async def fetch_recipe_instructions(recipe_id: str) -> list[str]:
+    """Async fetch_recipe_instructions. Shares INSTRUCTIONS_CACHE with the sync version."""
+    key = str(recipe_id)
+    cached = fb.INSTRUCTIONS_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def load() -> list[str]:
+        cached = fb.INSTRUCTIONS_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        url = fb._instructions_request(recipe_id)
+        steps = fb._parse_instructions(await upstream.aget(url, headers=fb.API_HEADERS))
+        return fb._store_instructions(key, steps)
+
+    try:
+        return await INSTRUCTIONS_FLIGHT.do(key, load)
+    except Exception as e:
+        fb.logger.error("Error fetching instructions for %r: %s", recipe_id, e)
+        return []
+
+
+async def _request_recipes_by_region(region: str, diet: str, limit: int) -> list[dict] | None:
+    url, params = fb._region_request(region, diet, limit)
+    try:
+        return fb._parse_region(await upstream.aget(url, params=params, headers=fb.API_HEADERS))
+    except fb.UpstreamError as e:
+        if e.status != 400:
+            raise
+
+    for alt_params in fb._alternative_region_params(region, params):
+        response = await upstream.aget(url, params=alt_params, headers=fb.API_HEADERS)
+        recipes = fb._parse_alternative_region(response, alt_params["region"])
+        if recipes:
+            return recipes
+    return None
+
+
+async def fetch_recipes_by_region(region: str, diet: str = "", limit: int = 10) -> list[dict]:
+    """Async fetch_recipes_by_region. Shares REGION_CACHE with the sync version."""
+    key = fb._region_cache_key(region, diet, limit)
+    cached = fb.REGION_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def load() -> list[dict]:
+        cached = fb.REGION_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        return fb._store_region(key, await _request_recipes_by_region(region, diet, limit))
+
+    try:
+        return await REGION_FLIGHT.do(key, load)
+    except Exception as e:
+        fb.logger.error("Error fetching recipes by region %r: %s", region, e)
+        return []
+
+
+async def _build_source_profile(source_recipe_title: str) -> fb.RecipeProfile:
+    with metrics.timed("title_lookup"):
+        source_recipe_data = await fetch_recipe_by_title(source_recipe_title)
+    recipe_id = source_recipe_data.get("Recipe_id", "") if source_recipe_data else ""
+    with metrics.timed("instructions"):
+        src_inst = await fetch_recipe_instructions(recipe_id) if recipe_id else []
+    with metrics.timed("source_features"):
+        return fb._source_profile_from(source_recipe_title, source_recipe_data, src_inst)
+
+
+async def _timed_region_fetch(region: str, limit: int) -> list[dict]:
+    with metrics.timed("region_fetch"):
+        return await fetch_recipes_by_region(region, limit=limit)
+
+
+async def recommend_recipes(
+    source_recipe_title: str,
+    target_cuisine: str,
+    excluded_allergens: list[str] | None = None,
+    top_k: int | None = None,
+) -> list[dict]:
+    """
+    Async recommend_recipes. Same results as flavor_bridge.recommend_recipes;
+    the source branch and the region fetch run as concurrent tasks.
+    """
+    excluded_allergens = excluded_allergens or []
+    fb._log_request(source_recipe_title, target_cuisine, excluded_allergens)
+
+    source_profile, target_recipes = await asyncio.gather(
+        _build_source_profile(source_recipe_title),
+        _timed_region_fetch(target_cuisine, fb.CANDIDATE_LIMIT),
+    )
+    return fb._rank_target_recipes(source_profile, target_recipes, target_cuisine, excluded_allergens, top_k)
@@ -0,0 +1,331 @@
+"""
+Local stand-in for the Foodoscope APIs, for offline load testing.
+Serves the recipe2-api endpoints (recipe-bytitle, instructions, region-diet)
+and the FlavorDB ones (entity search, food by-alias) in upstream response
+shapes, from src/data/mock_data plus an optional deterministic synthetic
+catalogue. Latency, error rate and payload size can be injected.
+
+Run:   python foodoscope_stub.py --port 8001 --recipes 5000 --latency-ms 80 --error-rate 0.01
+Point the API at it:
+       API_BASE_URL=http://127.0.0.1:8001/recipe2-api \\
+       FLAVORDB_BASE_URL=http://127.0.0.1:8001/flavordb python api.py
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from src.data import mock_data
+
+logger = logging.getLogger("flavorbridge.stub")
+
+RECIPE_PREFIX = "/recipe2-api"
+FLAVORDB_PREFIX = "/flavordb"
+
+
+@dataclass
+class StubConfig:
+    """
+    Injection knobs. Latency and errors apply to every upstream endpoint.
+
+    Args:
+        latency_ms: Added delay per request
+        jitter_ms: Extra uniform random delay, 0..jitter_ms
+        error_rate: Fraction of requests answered with error_status instead
+        error_status: Status code of injected errors
+        payload_pad: Filler bytes added to every recipe (and every FlavorDB answer)
+        synthetic_recipes: Generated recipes added to the mock catalogue
+        synthetic_regions: Regions the generated recipes are spread over (default: every UI cuisine)
+        seed: Seed for the catalogue and the injection RNG
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    payload_pad: int = 0
+    synthetic_recipes: int = 0
+    synthetic_regions: tuple[str, ...] | None = None
+    seed: int = 42
+
+
+# --- Catalogue ---
+# Words for synthetic titles and steps, all taken from the keyword tables the
+# pipeline scores on, so generated recipes exercise every feature extractor
+_PROTEINS = sorted({kw for kws in mock_data.PROTEIN_MAP.values() for kw in kws})
+_PROCESSES = sorted({kw for kws in mock_data.METHOD_KEYWORDS.values() for kw in kws})
+_DISHES = ["curry", "soup", "stew", "salad", "noodles", "rice", "pasta", "biryani", "ramen", "casserole",
+           "stir-fry", "kimchi", "minestrone", "tacos", "pie", "risotto", "dumplings", "skewers"]
+_STYLES = ["spicy", "creamy", "crispy", "smoky", "tangy", "hearty", "garlic", "lemon", "ginger", "herb"]
+_INGREDIENTS = ["onion", "garlic", "tomato", "butter", "milk", "olive oil", "soy sauce", "egg", "black pepper",
+                "cream", "cheese", "ginger", "coconut milk", "chili", "basil", "cumin"]
+_DIETS = ("vegan", "pescetarian", "ovo_vegetarian", "lacto_vegetarian", "ovo_lacto_vegetarian")
+
+
+def _flag(value: bool) -> str:
+    return "1.0" if value else "0.0"
+
+
+def _mock_catalogue() -> tuple[list[dict], dict[str, list[str]]]:
+    """mock_data.MOCK_RECIPES in recipe2-api shape. Ids follow INSTRUCTIONS (C001, K001, I001, ...)."""
+    recipes, steps = [], {}
+    for region_key, region_recipes in mock_data.MOCK_RECIPES.items():
+        for i, mock in enumerate(region_recipes):
+            recipe_id = f"{region_key[0].upper()}{i + 1:03d}"
+            recipes.append({
+                "Recipe_id": recipe_id,
+                "Recipe_title": mock["title"],
+                "Region": mock["region"],
+                "Continent": mock.get("continent", ""),
+                "Calories": str(mock.get("calories", "")),
+                "prep_time": str(mock.get("prep_time", 0)),
+                "cook_time": str(mock.get("cook_time", 0)),
+                "servings": str(mock.get("servings", "")),
+                "Processes": "||".join(mock.get("processes", [])),
+                **{diet: _flag(mock.get("diet", {}).get(diet, False)) for diet in _DIETS},
+            })
+            instructions = mock_data.INSTRUCTIONS.get(recipe_id)
+            steps[recipe_id] = instructions["steps"] if instructions else [f"{p} the ingredients" for p in mock.get("processes", [])]
+    return recipes, steps
+
+
+def _synthetic_catalogue(count: int, rng: random.Random,
+                         regions: tuple[str, ...] | None = None) -> tuple[list[dict], dict[str, list[str]]]:
+    regions = list(regions or dict.fromkeys(mock_data.TARGET_CUISINES + mock_data.COMFORT_CUISINES))
+    recipes, steps = [], {}
+    for i in range(count):
+        recipe_id = str(100000 + i)
+        title_words = [rng.choice(_STYLES)] if rng.random() < 0.6 else []
+        if rng.random() < 0.7:
+            title_words.append(rng.choice(_PROTEINS))
+        title_words.append(rng.choice(_DISHES))
+        processes = rng.sample(_PROCESSES, rng.randint(1, min(6, len(_PROCESSES))))
+        recipes.append({
+            "Recipe_id": recipe_id,
+            "Recipe_title": " ".join(title_words).title(),
+            "Region": rng.choice(regions),
+            "Continent": "",
+            "Calories": f"{rng.uniform(80, 900):.1f}",
+            "prep_time": str(rng.randint(0, 45)),
+            "cook_time": str(rng.randint(0, 120)),
+            "servings": str(rng.randint(1, 8)),
+            "Processes": "||".join(processes),
+            **{diet: _flag(rng.random() < 0.8) for diet in _DIETS},
+        })
+        steps[recipe_id] = [
+            f"{rng.choice(_PROCESSES)} the {' and '.join(rng.sample(_INGREDIENTS, rng.randint(1, 3)))}"
+            for _ in range(rng.randint(2, 14))
+        ]
+    return recipes, steps
+
+
+# --- FlavorDB Entities ---
+# Readable entity name -> FlavorDB category, covering every allergen the UI offers
+_ENTITY_CATEGORIES = {
+    "Milk": "Dairy", "Cream": "Dairy", "Cheese": "Dairy", "Butter": "Dairy", "Yogurt": "Dairy", "Oat Milk": "Dairy",
+    "Peanut": "Legume", "Beans": "Legume", "Soybean": "Legume", "Lentils": "Legume", "Chickpea": "Legume",
+    "Almond": "Nut", "Cashew": "Nut", "Walnut": "Nut", "Hazelnut": "Nut", "Sunflower Seeds": "Seed",
+    "Egg": "Animal Product", "Chicken": "Meat", "Beef": "Meat",
+    "Fish": "Fish", "Shrimp": "Seafood", "Prawn": "Seafood",
+    "Bread": "Bakery", "Wort": "Beverage Alcoholic", "Oat Flour": "Cereal", "Wheat": "Cereal", "Rice": "Cereal",
+    "Papaya": "Fruit", "Orange": "Fruit", "Mango": "Fruit", "Lemon": "Fruit", "Pineapple": "Fruit",
+    "Garlic": "Vegetable", "Onion": "Vegetable", "Shallots": "Vegetable", "Asafoetida": "Spice",
+    "Tomato": "Vegetable Fruit", "Mushroom": "Fungus",
+}
+
+
+def _similar_molecules(a: str, b: str, seed: int) -> int:
+    digest = hashlib.blake2b(f"{seed}:{a}:{b}".encode(), digest_size=2).digest()
+    return 20 + int.from_bytes(digest, "big") % 140
+
+
+class StubState:
+    """Catalogue, injection RNG and per-endpoint counters for one stub app."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        recipes, steps = _mock_catalogue()
+        extra, extra_steps = _synthetic_catalogue(
+            config.synthetic_recipes, random.Random(config.seed), config.synthetic_regions)
+        self.recipes = recipes + extra
+        self.steps = {**steps, **extra_steps}
+        self.titles_lower = [r["Recipe_title"].lower() for r in self.recipes]
+        self.by_region: dict[str, list[dict]] = {}
+        for recipe in self.recipes:
+            self.by_region.setdefault(recipe["Region"].lower(), []).append(recipe)
+        self.requests: Counter = Counter()
+        self.injected_errors = 0
+
+    def roll(self) -> tuple[float, bool]:
+        """(delay seconds, inject an error?) for one request."""
+        with self._rng_lock:
+            jitter = self._rng.uniform(0, self.config.jitter_ms) if self.config.jitter_ms else 0.0
+            fail = self.config.error_rate > 0 and self._rng.random() < self.config.error_rate
+        return (self.config.latency_ms + jitter) / 1000.0, fail
+
+    def padded(self, recipes: list[dict]) -> list[dict]:
+        if not self.config.payload_pad:
+            return recipes
+        filler = "x" * self.config.payload_pad
+        return [{**r, "Description": filler} for r in recipes]
+
+
+def create_app(config: StubConfig | None = None) -> Flask:
+    """Flask app serving the stub endpoints under /recipe2-api and /flavordb."""
+    state = StubState(config or StubConfig())
+    app = Flask("foodoscope_stub")
+    app.config["STUB_STATE"] = state
+
+    @app.before_request
+    def inject():
+        if request.path.startswith("/_stub"):
+            return None
+        state.requests[request.url_rule.endpoint if request.url_rule else "unknown"] += 1
+        delay, fail = state.roll()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            state.injected_errors += 1
+            return jsonify({"success": False, "message": "injected error"}), state.config.error_status
+        return None
+
+    @app.get(f"{RECIPE_PREFIX}/recipe-bytitle/recipeByTitle")
+    def recipe_by_title():
+        query = request.args.get("title", "").lower()
+        hits = [r for r, t in zip(state.recipes, state.titles_lower) if query in t] if query else []
+        return jsonify({
+            "success": bool(hits),
+            "message": f"{len(hits)} recipes found" if hits else "No recipes found",
+            "data": state.padded(hits),
+        })
+
+    @app.get(f"{RECIPE_PREFIX}/instructions/<recipe_id>")
+    def instructions(recipe_id):
+        steps = state.steps.get(recipe_id)
+        if steps is None:
+            return jsonify({"success": False, "message": "Recipe not found"}), 404
+        return jsonify({"recipe_id": recipe_id, "steps": steps})
+
+    @app.get(f"{RECIPE_PREFIX}/recipe/region-diet/region-diet")
+    def region_diet():
+        region = request.args.get("region", "").strip().lower()
+        diet = request.args.get("diet", "")
+        limit = request.args.get("limit", 10, type=int)
+        if region not in state.by_region:
+            return jsonify({"success": False, "message": f"Invalid region '{region}'"}), 400
+        recipes = [r for r in state.by_region[region] if not diet or r.get(diet, "1.0") == "1.0"][:limit]
+        return jsonify({
+            "success": bool(recipes),
+            "message": f"{len(recipes)} recipes found" if recipes else "No recipes found",
+            "data": state.padded(recipes),
+        })
+
+    @app.get(f"{FLAVORDB_PREFIX}/entities/by-entity-alias-readable")
+    def entity_search():
+        query = request.args.get("entity_alias_readable", "").strip().lower()
+        content = [
+            {"entity_alias_readable": name, "entity_alias": name.lower().replace(" ", "_"), "category_readable": category}
+            for name, category in _ENTITY_CATEGORIES.items()
+            if query and query in name.lower()
+        ]
+        body: dict[str, Any] = {"content": content, "totalElements": len(content)}
+        if state.config.payload_pad:
+            body["Description"] = "x" * state.config.payload_pad
+        return jsonify(body)
+
+    @app.get(f"{FLAVORDB_PREFIX}/food/by-alias")
+    def food_by_alias():
+        alias = request.args.get("food_pair", "").strip()
+        if alias.lower() == mock_data.MOCK_FOOD_PAIR["entityId"]:
+            body = dict(mock_data.MOCK_FOOD_PAIR)
+        elif alias in _ENTITY_CATEGORIES:
+            similar = sorted(
+                (
+                    {
+                        "entityName": name,
+                        "category": category,
+                        "similarMolecules": _similar_molecules(alias, name, state.config.seed),
+                        "wikipedia": f"https://en.wikipedia.org/wiki/{name.replace(' ', '_')}",
+                    }
+                    for name, category in _ENTITY_CATEGORIES.items() if name != alias
+                ),
+                key=lambda e: (-e["similarMolecules"], e["entityName"]),
+            )
+            body = {"entityId": alias.lower(), "topSimilarEntities": similar[:10]}
+        else:
+            body = {"entityId": alias.lower(), "topSimilarEntities": []}
+        if state.config.payload_pad:
+            body["Description"] = "x" * state.config.payload_pad
+        return jsonify(body)
+
+    @app.get("/_stub/stats")
+    def stub_stats():
+        return jsonify({
+            "recipes": len(state.recipes),
+            "requests": dict(state.requests),
+            "injected_errors": state.injected_errors,
+            "config": vars(state.config),
+        })
+
+    return app
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args: Any, **kwargs: Any) -> None:
+        pass  # One access-log line per request drowns out a load test's own output
+
+
+def start(config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0,
+          quiet: bool = True) -> tuple[Any, str]:
+    """
+    Serve a stub on a daemon thread (port 0 picks a free port).
+
+    Returns:
+        (server, root URL) - use f"{root}/recipe2-api" and f"{root}/flavordb"; server.shutdown() stops it
+    """
+    handler = _QuietRequestHandler if quiet else WSGIRequestHandler
+    server = make_server(host, port, create_app(config), threaded=True, request_handler=handler)
+    threading.Thread(target=server.serve_forever, name="foodoscope-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+if __name__ == "__main__":
+    from logging_setup import configure_logging
+
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Serve a local Foodoscope stand-in backed by mock_data.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status code of injected failures")
+    parser.add_argument("--payload-pad", type=int, default=0, help="filler bytes added to every recipe")
+    parser.add_argument("--recipes", type=int, default=0, help="synthetic recipes added to the mock catalogue")
+    parser.add_argument("--regions", nargs="+", help="regions for synthetic recipes (default: every UI cuisine)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quiet", action="store_true", help="no access log line per request")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        error_status=args.error_status, payload_pad=args.payload_pad,
+        synthetic_recipes=args.recipes, synthetic_regions=tuple(args.regions) if args.regions else None,
+        seed=args.seed,
+    )
+    root = f"http://{args.host}:{args.port}"
+    logger.info("Foodoscope stub on %s: API_BASE_URL=%s%s FLAVORDB_BASE_URL=%s%s",
+                root, root, RECIPE_PREFIX, root, FLAVORDB_PREFIX)
+    handler_class = _QuietRequestHandler if args.quiet else WSGIRequestHandler
+    make_server(args.host, args.port, create_app(stub_config), threaded=True, request_handler=handler_class).serve_forever()
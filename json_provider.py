@@ -0,0 +1,53 @@
+"""
+Flask JSON provider with an orjson fast path.
+When orjson is installed, `jsonify` / `app.json.dumps` serialize through it
+(sorted keys, UTF-8 instead of \\u escapes), compact or with the indent=2 that
+Flask's debug mode asks for; otherwise, or whenever a caller passes other
+stdlib-only options, it falls back to Flask's stdlib provider. Either way the
+output parses to the same value: datetimes and dates are passed through to
+Flask's default() (HTTP-date strings) instead of orjson's RFC 3339 encoding.
+"""
+
+from __future__ import annotations
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+if orjson is not None:
+    # PASSTHROUGH_DATETIME: datetime/date go to default(), which formats them the way Flask does
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    _COMPACT_SEPARATORS = (",", ":")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider that encodes and decodes with orjson when available."""
+
+    backend = "orjson" if orjson is not None else "json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # response() asks for compact separators, or indent=2 in debug mode; orjson has both styles
+        if orjson is not None and (not kwargs or kwargs == {"separators": _COMPACT_SEPARATORS}):
+            option = _ORJSON_OPTIONS
+        elif orjson is not None and kwargs == {"indent": 2}:
+            option = _ORJSON_OPTIONS | orjson.OPT_INDENT_2
+        else:
+            option = None
+        if option is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+            except (orjson.JSONEncodeError, TypeError):
+                pass  # e.g. ints beyond 64 bits - let the stdlib encoder handle (or reject) it
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # Re-raise through the stdlib so callers see the usual ValueError message
+        return super().loads(s, **kwargs)
@@ -0,0 +1,100 @@
+"""
+Aho-Corasick multi-keyword matcher.
+Finds every keyword occurring anywhere in a text in one left-to-right pass,
+with the same answer as running `kw in text` for each keyword.
+
+Uses the pyahocorasick C extension when installed; otherwise falls back to
+a pure-Python automaton with identical results.
+"""
+
+from __future__ import annotations
+from collections import deque
+from typing import Iterable, Iterator
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton. The pure-Python fallback folds failure links into
+    a full transition table so scanning is one dict lookup per character.
+
+    Args:
+        keywords: Keywords to match (exact, case-sensitive substrings; duplicates ignored)
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(kw for kw in keywords if kw))
+        self._native = None
+        if ahocorasick is not None and self.keywords:
+            native = ahocorasick.Automaton()
+            for kw in self.keywords:
+                native.add_word(kw, kw)
+            native.make_automaton()
+            self._native = native
+            return
+
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[str]] = [[]]
+
+        # 1. Trie of all keywords
+        for kw in self.keywords:
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(kw)
+
+        # 2. Failure links (BFS), folding them into a full transition table so
+        #    scanning never has to follow a failure chain
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            trans = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                trans[ch] = nxt
+                queue.append(nxt)
+            delta[state] = trans
+
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, str]]:
+        """Yield (end_index, keyword) for every occurrence; end_index is exclusive."""
+        if self._native is not None:
+            for end, kw in self._native.iter(text):
+                yield end + 1, kw
+            return
+        delta, out = self._delta, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for kw in out[state]:
+                    yield i + 1, kw
+
+    def matches(self, text: str) -> set[str]:
+        """Set of distinct keywords that occur in text."""
+        if self._native is not None:
+            return {kw for _, kw in self._native.iter(text)}
+        delta, out = self._delta, self._out
+        state = 0
+        hits: set[str] = set()
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
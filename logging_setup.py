@@ -0,0 +1,69 @@
+"""
+Logging configuration for the FlavorBridge service.
+Pipeline modules log through stdlib `logging` with lazy %-style arguments, so
+debug traces are never formatted unless DEBUG is enabled. Output is plain text
+or one JSON object per line (LOG_FORMAT=json) for the log aggregator.
+"""
+
+from __future__ import annotations
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, plus any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """
+    Install one stderr handler on the root logger (idempotent) and set the
+    "flavorbridge.*" level.
+
+    Args:
+        level: Level name (defaults to LOG_LEVEL)
+        fmt: "text" or "json" (defaults to LOG_FORMAT)
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, "_flavorbridge", False):
+            root.removeHandler(handler)
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler._flavorbridge = True
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+
+    # DEBUG applies to our own loggers; third-party loggers (urllib3, werkzeug) stay at INFO or above
+    level_no = logging.getLevelName(level or LOG_LEVEL)
+    if not isinstance(level_no, int):
+        level_no = logging.INFO
+    logging.getLogger("flavorbridge").setLevel(level_no)
+    root.setLevel(max(level_no, logging.INFO))
@@ -0,0 +1,265 @@
+"""
+In-process metrics for the FlavorBridge service.
+Labelled counters and histograms, rendered in the Prometheus text format for
+/api/metrics. Cache and single-flight counters are read from their own
+registries at scrape time. `timed(stage)` feeds the stage histogram and the
+per-request timings that api.py turns into a Server-Timing header.
+"""
+
+from __future__ import annotations
+import bisect
+import contextvars
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import cache
+import singleflight
+
+# Seconds; spans a cache hit (~50us) through a slow upstream call
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY: dict[str, "Counter | Histogram"] = {}
+_COLLECTORS: list[Callable[[], list[str]]] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+
+    Args:
+        name: Metric name (Prometheus convention: ends in _total)
+        help: One-line description
+        labelnames: Label names; inc() must pass a value for each
+    """
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _REGISTRY[name] = self
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items)
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels.
+
+    Args:
+        name: Metric name (Prometheus convention: ends in the unit, e.g. _seconds)
+        help: One-line description
+        labelnames: Label names; observe() must pass a value for each
+        buckets: Sorted upper bounds; +Inf is implied
+    """
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _REGISTRY[name] = self
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(tuple(str(labels[n]) for n in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), series):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-2]!r}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+def register_collector(collector: Callable[[], list[str]]) -> None:
+    """Add a callable returning exposition lines, evaluated on every scrape."""
+    if collector not in _COLLECTORS:
+        _COLLECTORS.append(collector)
+
+
+def render() -> str:
+    """Every registered metric and collector in Prometheus text format (version 0.0.4)."""
+    lines: list[str] = []
+    for metric in list(_REGISTRY.values()):
+        lines.extend(metric.render())
+    for collector in list(_COLLECTORS):
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def _family(name: str, kind: str, help: str, samples: list[tuple[str, Any]]) -> list[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines.extend(f'{name}{{{label}}} {_format_value(value)}' for label, value in samples)
+    return lines
+
+
+def cache_lines() -> list[str]:
+    """Counters from every TTLCache (cache.all_stats), labelled by cache name."""
+    stats = sorted(cache.all_stats().items())
+    lines: list[str] = []
+    for field, kind, help in (
+        ("hits", "counter", "Cache lookups answered with a stored value."),
+        ("negative_hits", "counter", "Cache lookups answered with a stored negative (not found) result."),
+        ("misses", "counter", "Cache lookups that found nothing usable."),
+        ("evictions", "counter", "Entries evicted to stay under maxsize."),
+        ("expirations", "counter", "Entries dropped after their TTL."),
+        ("size", "gauge", "Entries currently held."),
+    ):
+        name = f"flavorbridge_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.extend(_family(name, kind, help, [(f'cache="{_escape(n)}"', st[field]) for n, st in stats]))
+    return lines
+
+
+def singleflight_lines() -> list[str]:
+    """Call/execution counters from every single-flight group, labelled by group name."""
+    stats = sorted(singleflight.all_stats().items())
+    lines: list[str] = []
+    for field, kind, help in (
+        ("calls", "counter", "Calls made through the group."),
+        ("executions", "counter", "Calls that ran the underlying function."),
+        ("coalesced", "counter", "Calls that shared an in-flight execution."),
+        ("in_flight", "gauge", "Executions currently running."),
+    ):
+        name = f"flavorbridge_singleflight_{field}" + ("_total" if kind == "counter" else "")
+        lines.extend(_family(name, kind, help, [(f'group="{_escape(n)}"', st[field]) for n, st in stats]))
+    return lines
+
+
+register_collector(cache_lines)
+register_collector(singleflight_lines)
+
+
+# --- Pipeline Metrics ---
+STAGE_SECONDS = Histogram("flavorbridge_stage_seconds", "Time spent in each recommendation pipeline stage.", ("stage",))
+UPSTREAM_SECONDS = Histogram("flavorbridge_upstream_request_seconds", "Upstream HTTP call latency.", ("endpoint",))
+UPSTREAM_RESPONSES = Counter("flavorbridge_upstream_responses_total",
+                             "Upstream HTTP responses by status code (error = no response).", ("endpoint", "status"))
+CANDIDATES_SCORED = Counter("flavorbridge_candidates_scored_total", "Candidate recipes scored.")
+CANDIDATES_FILTERED = Counter("flavorbridge_candidates_filtered_total", "Candidate recipes dropped by the allergen filter.")
+
+# (stage, seconds) pairs for the current request; None outside a timed request
+_request_timings: contextvars.ContextVar[list[tuple[str, float]] | None] = contextvars.ContextVar(
+    "flavorbridge_request_timings", default=None
+)
+
+
+def begin_request() -> None:
+    """Start collecting stage timings for the request running in this context."""
+    _request_timings.set([])
+
+
+def request_timings() -> list[tuple[str, float]]:
+    return list(_request_timings.get() or ())
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    """Add a duration to the current request's timings without touching the stage histogram."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the block into STAGE_SECONDS{stage} and the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        record_timing(stage, elapsed)
+
+
+def server_timing_header(timings: list[tuple[str, float]], total: float | None = None) -> str:
+    """
+    Server-Timing value: one entry per stage (repeats summed, in first-seen order), durations in ms.
+
+    Args:
+        timings: (stage, seconds) pairs
+        total: Whole-request duration in seconds, emitted as "app"
+    """
+    summed: dict[str, float] = {}
+    for stage, seconds in timings:
+        summed[stage] = summed.get(stage, 0.0) + seconds
+    entries = [f"{_TOKEN_UNSAFE.sub('_', stage)};dur={seconds * 1000:.2f}" for stage, seconds in summed.items()]
+    if total is not None:
+        entries.append(f"app;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+# Numbers, short-prefixed ids ("C001") and UUIDs; not words with a digit in them ("recipe2-api")
+_ID_SEGMENT = re.compile(r"/[A-Za-z]{0,4}\d[\w-]*(?=/|$)")
+
+
+def upstream_endpoint(url: str) -> str:
+    """Low-cardinality label for an upstream URL: its path with id-like segments replaced by {id}."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def observe_upstream(url: str, seconds: float, status: int | None) -> None:
+    endpoint = upstream_endpoint(url)
+    UPSTREAM_SECONDS.observe(seconds, endpoint=endpoint)
+    UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=status if status is not None else "error")
+    record_timing("upstream", seconds)
@@ -0,0 +1,160 @@
+"""
+Opt-in cProfile capture for single requests.
+With PROFILING_ENABLED on, a request that asks for it (X-Profile header or
+?profile=1) runs its pipeline call under cProfile and leaves three files in
+PROFILE_DIR: the raw .pstats dump (snakeviz, pstats.Stats), a .txt summary
+of the top functions, and a .folded collapsed-stack file for flamegraph.pl
+or speedscope.
+
+cProfile only sees the calling thread: work handed to the fetch pool shows
+up as time waiting on the future, not as the fetch itself.
+"""
+
+from __future__ import annotations
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger("flavorbridge.profiling")
+
+# --- Configuration ---
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")  # Keep off in production
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))  # Functions listed in the .txt summary
+PROFILE_MAX_REPORTS = int(os.getenv("PROFILE_MAX_REPORTS", "50"))  # Oldest reports are pruned beyond this
+
+# One profiler at a time: newer cProfile refuses to start while another is active
+_profile_lock = threading.Lock()
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9]+")
+_MIN_FOLDED_US = 1  # Collapsed stacks below this many microseconds are dropped
+
+
+def requested(*flags: str | None) -> bool:
+    """True if profiling is enabled and any flag (header or query value) is truthy."""
+    return PROFILING_ENABLED and any(
+        flag is not None and flag.strip().lower() in ("1", "true", "yes", "on") for flag in flags
+    )
+
+
+def profile_call(label: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, str | None]:
+    """
+    Call fn(*args, **kwargs) under cProfile and write its reports.
+    If another request is being profiled, fn runs unprofiled.
+
+    Args:
+        label: Human-readable tag folded into the report file names
+
+    Returns:
+        (fn's result, report file stem in PROFILE_DIR or None if not profiled)
+    """
+    if not _profile_lock.acquire(blocking=False):
+        logger.info("Profiler busy, running %r unprofiled", label)
+        return fn(*args, **kwargs), None
+    try:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+    finally:
+        _profile_lock.release()
+
+    try:
+        stem = write_reports(profiler, label, elapsed)
+    except OSError as e:
+        logger.error("Could not write profile for %r to %s: %s", label, PROFILE_DIR, e)
+        return result, None
+    logger.info("Profiled %r in %.1f ms -> %s", label, elapsed * 1000, os.path.join(PROFILE_DIR, stem))
+    return result, stem
+
+
+def write_reports(profiler: cProfile.Profile, label: str, elapsed: float) -> str:
+    """Write <stem>.pstats, <stem>.txt and <stem>.folded to PROFILE_DIR. Returns the stem."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = _UNSAFE_CHARS.sub("-", label).strip("-")[:60] or "request"
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}"
+    base = os.path.join(PROFILE_DIR, stem)
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(base + ".pstats")
+
+    summary = io.StringIO()
+    summary.write(f"{label}\nwall time: {elapsed * 1000:.2f} ms\n\n")
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(summary.getvalue())
+
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {us}\n" for stack, us in collapsed_stacks(stats.stats))
+
+    _prune_reports()
+    return stem
+
+
+def _frame_label(func: tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":  # Built-ins: name is already "<built-in method ...>"
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(raw: dict) -> list[tuple[str, int]]:
+    """
+    Collapsed stacks ("root;child;leaf microseconds") rebuilt from pstats'
+    caller graph. cProfile keeps caller->callee edges rather than whole stacks,
+    so a function's own time is split across its callers in proportion to the
+    time each caller spent in it, the same approximation pstats-based
+    flame-graph tools make.
+
+    Args:
+        raw: pstats.Stats.stats ({func: (cc, nc, tt, ct, callers)})
+    """
+    callees: dict[tuple, list[tuple[tuple, float]]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in raw.items() if not entry[4]]
+
+    totals: dict[str, float] = {}
+
+    def walk(func: tuple, share: float, path: tuple[str, ...], seen: frozenset) -> None:
+        _, _, tt, ct, _ = raw[func]
+        path = path + (_frame_label(func),)
+        self_time = tt * share
+        if self_time * 1e6 >= _MIN_FOLDED_US:
+            key = ";".join(path)
+            totals[key] = totals.get(key, 0.0) + self_time
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = raw[callee][3]
+            if callee in seen or callee_ct <= 0:
+                continue  # Recursion is folded into the outermost frame
+            child_share = edge_ct * share / callee_ct
+            if edge_ct * share * 1e6 >= _MIN_FOLDED_US:
+                walk(callee, min(child_share, 1.0), path, seen | {callee})
+
+    for root in roots:
+        walk(root, 1.0, (), frozenset({root}))
+    return [(stack, round(seconds * 1e6)) for stack, seconds in sorted(totals.items()) if round(seconds * 1e6) > 0]
+
+
+def _prune_reports() -> None:
+    reports: dict[str, float] = {}
+    for name in os.listdir(PROFILE_DIR):
+        stem, ext = os.path.splitext(name)
+        if ext in (".pstats", ".txt", ".folded"):
+            reports[stem] = max(reports.get(stem, 0.0), os.path.getmtime(os.path.join(PROFILE_DIR, name)))
+    for stem in sorted(reports, key=reports.get)[:max(0, len(reports) - PROFILE_MAX_REPORTS)]:
+        for ext in (".pstats", ".txt", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, stem + ext))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,337 @@
+"""
+Local full-text search over recipe titles seen in upstream responses.
+Titles go into an inverted index (term -> {doc id: term frequency}); a query
+matches documents containing every query token, whole or as a prefix, and
+results are ranked with BM25. Documents are the raw Foodoscope recipe dicts,
+so local answers have the same shape as upstream ones. The index is rebuilt
+from SEARCH_INDEX_PATH at startup and saved back in the background.
+"""
+
+from __future__ import annotations
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable
+
+from cache import MISSING, TTLCache
+
+logger = logging.getLogger("flavorbridge.search")
+
+# --- Configuration ---
+SEARCH_INDEX_PATH = os.getenv(  # Empty string disables persistence
+    "SEARCH_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index.json")
+)
+SEARCH_INDEX_MAX_DOCS = int(os.getenv("SEARCH_INDEX_MAX_DOCS", "50000"))
+SEARCH_INDEX_SAVE_INTERVAL = float(os.getenv("SEARCH_INDEX_SAVE_INTERVAL", "60"))
+# Opt-in: also answer uncovered queries locally once this many titles match (0 = only covered queries)
+SEARCH_LOCAL_MIN_RESULTS = int(os.getenv("SEARCH_LOCAL_MIN_RESULTS", "0"))
+SEARCH_QUERY_TTL = float(os.getenv("SEARCH_QUERY_TTL", "3600"))
+INDEX_VERSION = 1
+
+# --- BM25 ---
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_WEIGHT = 0.8  # A token matched as a prefix ranks below the same token matched whole
+MAX_PREFIX_TERMS = 256  # Expansion cap for very short prefixes
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Normalized query -> doc ids of its upstream answer, in upstream order. Covered
+# queries are answered with exactly those docs until the entry expires
+# (negative = upstream found nothing)
+QUERY_CACHE = TTLCache("search_queries", maxsize=4096, ttl=SEARCH_QUERY_TTL)
+
+
+def tokenize(text: Any) -> list[str]:
+    """Lowercased word tokens."""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+def _doc_id(recipe: dict) -> str | None:
+    title = recipe.get("Recipe_title")
+    if not title:
+        return None
+    recipe_id = recipe.get("Recipe_id")
+    return str(recipe_id) if recipe_id not in (None, "") else f"title:{normalize_query(title)}"
+
+
+class SearchIndex:
+    """
+    Thread-safe inverted index over recipe titles.
+
+    Args:
+        max_docs: New documents beyond this many are ignored (existing ones still update)
+    """
+
+    def __init__(self, max_docs: int = SEARCH_INDEX_MAX_DOCS):
+        self.max_docs = max_docs
+        self._lock = threading.Lock()
+        self._docs: dict[str, dict] = {}
+        self._doc_terms: dict[str, Counter] = {}
+        self._doc_len: dict[str, int] = {}
+        self._total_len = 0
+        self._postings: dict[str, dict[str, int]] = {}
+        self._vocab: list[str] = []  # Sorted terms, for prefix lookups; rebuilt lazily
+        self._vocab_stale = False
+        self.changes = 0  # Bumped on every add/update; lets savers skip clean indexes
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_recipes(self, recipes: Iterable[dict]) -> int:
+        """Index (or refresh) recipes. Returns how many were new or changed."""
+        changed = 0
+        with self._lock:
+            for recipe in recipes:
+                if not isinstance(recipe, dict):
+                    continue
+                doc_id = _doc_id(recipe)
+                if doc_id is None:
+                    continue
+                existing = self._docs.get(doc_id)
+                if existing is None and len(self._docs) >= self.max_docs:
+                    continue
+                if existing == recipe:
+                    continue
+                if existing is not None and existing.get("Recipe_title") == recipe.get("Recipe_title"):
+                    self._docs[doc_id] = recipe  # Same title: postings are unchanged
+                else:
+                    if existing is not None:
+                        self._unindex(doc_id)
+                    self._docs[doc_id] = recipe
+                    self._index(doc_id, recipe["Recipe_title"])
+                changed += 1
+            self.changes += changed
+        return changed
+
+    def _index(self, doc_id: str, title: str) -> None:
+        terms = Counter(tokenize(title))
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._doc_len[doc_id] = length
+        self._total_len += length
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocab_stale = True
+            postings[doc_id] = tf
+
+    def _unindex(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._vocab_stale = True
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+
+    def _expand(self, token: str) -> list[tuple[str, float]]:
+        """(term, weight) pairs a query token matches: itself, then longer terms it prefixes."""
+        if self._vocab_stale:
+            self._vocab = sorted(self._postings)
+            self._vocab_stale = False
+        vocab = self._vocab
+        matches = [(token, 1.0)] if token in self._postings else []
+        i = bisect.bisect_right(vocab, token)
+        end = min(len(vocab), i + MAX_PREFIX_TERMS)
+        while i < end and vocab[i].startswith(token):
+            matches.append((vocab[i], PREFIX_WEIGHT))
+            i += 1
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> tuple[int, list[dict]]:
+        """
+        BM25-ranked title search. Every query token must match a title token
+        whole or as its prefix.
+
+        Args:
+            query: Free text
+            limit: Maximum recipes returned
+
+        Returns:
+            (total number of matches, best `limit` recipes in rank order)
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return 0, []
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return 0, []
+            avg_len = self._total_len / n_docs
+            scores: dict[str, float] | None = None
+            for token in tokens:
+                token_scores: dict[str, float] = {}
+                for term, weight in self._expand(token):
+                    postings = self._postings[term]
+                    df = len(postings)
+                    idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                    for doc_id, tf in postings.items():
+                        if scores is not None and doc_id not in scores:
+                            continue
+                        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+                        score = weight * idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+                        # A token counts once per document: its best-matching term
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: scores[doc_id] + s for doc_id, s in token_scores.items()}
+                if not scores:
+                    return 0, []
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], self._docs[kv[0]]["Recipe_title"], kv[0]))
+            return len(ranked), [self._docs[doc_id] for doc_id, _ in ranked[:limit]]
+
+    def get_docs(self, doc_ids: Iterable[str]) -> list[dict] | None:
+        """The documents for doc_ids in order, or None if any of them is no longer indexed."""
+        with self._lock:
+            docs = [self._docs.get(doc_id) for doc_id in doc_ids]
+        return None if any(doc is None for doc in docs) else docs
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return list(self._docs.values())
+
+    def stats(self) -> dict[str, Any]:
+        return {"docs": len(self._docs), "terms": len(self._postings), "max_docs": self.max_docs}
+
+
+INDEX = SearchIndex()
+_local_answers = 0
+_upstream_lookups = 0
+_saved_changes = 0
+
+
+def add_recipes(recipes: list[dict]) -> None:
+    """Recipe observer: index recipes from any upstream response (see flavor_bridge.add_recipe_observer)."""
+    INDEX.add_recipes(recipes)
+
+
+def local_search(query: str, limit: int = 20) -> tuple[int, list[dict]] | None:
+    """
+    Answer a search locally when the query's upstream answer was recorded
+    recently: the same count and recipes upstream returned. With
+    SEARCH_LOCAL_MIN_RESULTS set, uncovered queries matching at least that
+    many indexed titles are also answered (BM25 over the partial index).
+
+    Returns:
+        (count, recipes) or None when the query should go upstream
+    """
+    global _local_answers, _upstream_lookups
+    answer = QUERY_CACHE.get(normalize_query(query))
+    if answer is not MISSING:
+        doc_ids = answer or ()  # Negative entries store None
+        recipes = INDEX.get_docs(doc_ids)
+        if recipes is not None:
+            _local_answers += 1
+            return len(recipes), recipes[:limit]
+    elif SEARCH_LOCAL_MIN_RESULTS > 0:
+        count, recipes = INDEX.search(query, limit)
+        if count >= SEARCH_LOCAL_MIN_RESULTS:
+            _local_answers += 1
+            return count, recipes
+    _upstream_lookups += 1
+    return None
+
+
+def record_upstream_answer(query: str, recipes: list[dict]) -> None:
+    """Index an upstream search answer and mark the query as covered by the index."""
+    INDEX.add_recipes(recipes)
+    doc_ids = tuple(doc_id for doc_id in map(_doc_id, recipes) if doc_id is not None)
+    QUERY_CACHE.set(normalize_query(query), doc_ids or None, negative=not doc_ids)
+
+
+# --- Persistence ---
+
+def load_index(path: str | None = None) -> int:
+    """Rebuild INDEX from a persisted file (missing or unreadable files are ignored). Returns the doc count."""
+    global _saved_changes
+    path = path if path is not None else SEARCH_INDEX_PATH
+    if not path:
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable search index %s: %s", path, e)
+        return 0
+    if data.get("version") != INDEX_VERSION:
+        logger.warning("Ignoring search index %s with version %r", path, data.get("version"))
+        return 0
+    INDEX.add_recipes(data.get("docs", []))
+    _saved_changes = INDEX.changes
+    return len(INDEX)
+
+
+def save_index(path: str | None = None) -> bool:
+    """
+    Persist INDEX atomically (write to a uniquely named temp file, then rename) if it
+    changed since the last save, so autosave, atexit and other processes never share
+    a temp file. Returns True if written.
+    """
+    global _saved_changes
+    path = path if path is not None else SEARCH_INDEX_PATH
+    changes = INDEX.changes
+    if not path or changes == _saved_changes:
+        return False
+    docs = INDEX.snapshot()
+    tmp = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+                                      prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            json.dump({"version": INDEX_VERSION, "saved_at": time.time(), "docs": docs}, tmp, separators=(",", ":"))
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    _saved_changes = changes
+    logger.debug("Search index saved: %d docs to %s", len(docs), path)
+    return True
+
+
+def _save_quietly() -> None:
+    try:
+        save_index()
+    except OSError as e:
+        logger.warning("Could not persist search index: %s", e)
+
+
+def _autosave_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        _save_quietly()
+
+
+def start_persistence() -> None:
+    """Load the persisted index, then save changes every SEARCH_INDEX_SAVE_INTERVAL seconds and at exit."""
+    if not SEARCH_INDEX_PATH:
+        return
+    logger.info("Search index loaded: %d docs from %s", load_index(), SEARCH_INDEX_PATH)
+    threading.Thread(target=_autosave_loop, args=(SEARCH_INDEX_SAVE_INTERVAL,),
+                     name="search-index-save", daemon=True).start()
+    atexit.register(_save_quietly)
+
+
+def stats() -> dict[str, Any]:
+    return {
+        **INDEX.stats(),
+        "local_answers": _local_answers,
+        "upstream_lookups": _upstream_lookups,
+        "path": SEARCH_INDEX_PATH,
+    }
@@ -0,0 +1,142 @@
+"""
+Single-flight call collapsing.
+Concurrent callers asking for the same key share one in-flight execution
+and its result (or exception) instead of each hitting the upstream.
+SingleFlight is for threads, AsyncSingleFlight for coroutines on an event loop.
+"""
+
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+# Every group registers itself here so stats can be reported in one place
+_REGISTRY: dict[str, "SingleFlight | AsyncSingleFlight"] = {}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Thread-safe call group keyed by any hashable.
+
+    Args:
+        name: Name used in stats output
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        _REGISTRY[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() for key, or wait for the identical call already in flight and return its result."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesce_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+class AsyncSingleFlight:
+    """
+    Coroutine call group keyed by any hashable. Calls only collapse with calls
+    on the same event loop. The shared work runs in a task of its own, so a
+    cancelled caller (leader or not) leaves without cancelling it for the rest.
+
+    Args:
+        name: Name used in stats output
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[tuple[Any, Hashable], asyncio.Future] = {}  # (loop, key) -> shared task
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        _REGISTRY[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() for key, or the identical call already in flight on this loop."""
+        flight_key = (asyncio.get_running_loop(), key)
+        self.calls += 1
+        task = self._calls.get(flight_key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._calls[flight_key] = asyncio.ensure_future(fn())
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+        # shield: cancelling this caller must not cancel the task other callers share
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: tuple[Any, Hashable], task: asyncio.Future) -> None:
+        if self._calls.get(flight_key) is task:
+            del self._calls[flight_key]
+        if not task.cancelled():
+            task.exception()  # Every caller may have left; avoids "exception was never retrieved"
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesce_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+def all_stats() -> dict[str, dict[str, Any]]:
+    """Stats for every single-flight group created in this process, keyed by name."""
+    return {name: g.stats() for name, g in _REGISTRY.items()}
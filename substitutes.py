@@ -0,0 +1,368 @@
+"""
+Allergen substitute service backed by FlavorDB.
+Runs the entity search -> dominant category -> by-alias chain once per
+normalized allergen and caches the outcome. Concurrent identical requests
+share one upstream chain. With SUBSTITUTE_SPECULATIVE_PAIRING on, the
+pairing call is started alongside the search, so a cold lookup usually costs
+one round trip (at the price of a wasted call when the guess is wrong).
+
+Known allergens (COMMON_ALLERGENS + ALLERGEN_SUBSTITUTES) are also kept in a
+precomputed table persisted to SUBSTITUTE_TABLE_PATH, warmed at startup or
+offline with:  python substitutes.py [--refresh]
+Only found substitutes go in the table. A miss may be transient, so it is
+cached for NEGATIVE_CACHE_TTL and looked up again on the next warm-up.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
+
+import upstream
+from cache import MISSING, TTLCache
+from singleflight import SingleFlight
+
+logger = logging.getLogger("flavorbridge.substitutes")
+
+# --- FlavorDB Configuration ---
+FLAVORDB_BASE_URL = os.getenv("FLAVORDB_BASE_URL", "https://api.foodoscope.com/flavordb").rstrip("/")
+SEARCH_URL = f"{FLAVORDB_BASE_URL}/entities/by-entity-alias-readable"
+PAIRING_URL = f"{FLAVORDB_BASE_URL}/food/by-alias"
+
+# --- Cache Configuration ---
+SUBSTITUTE_CACHE_TTL = float(os.getenv("SUBSTITUTE_CACHE_TTL", "86400"))  # FlavorDB data is effectively static
+SUBSTITUTE_NEGATIVE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+# Start the pairing call alongside the search; wasted when the search finds nothing or picks another alias
+SPECULATIVE_PAIRING = os.getenv("SUBSTITUTE_SPECULATIVE_PAIRING", "false").lower() in ("1", "true", "yes")
+TOP_SUBSTITUTES = 3
+
+SUBSTITUTE_TABLE_PATH = os.getenv(  # Empty string disables persistence
+    "SUBSTITUTE_TABLE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "substitute_table.json")
+)
+TABLE_VERSION = 1
+
+SUBSTITUTE_CACHE = TTLCache("allergen_substitutes", maxsize=512, ttl=SUBSTITUTE_CACHE_TTL, negative_ttl=SUBSTITUTE_NEGATIVE_TTL)
+_FLIGHT = SingleFlight("allergen_substitutes")
+_PAIRING_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="flavordb-pairing")
+
+# Negative outcomes are cached as a reason code; the message is formatted per request
+NO_ENTITY = "no_entity"
+NO_CATEGORY = "no_category"
+
+# Precomputed chain results (found substitutes only) keyed by normalized allergen;
+# replaced wholesale, never mutated
+_table: dict[str, dict] = {}
+_table_hits = 0
+
+
+class SubstituteError(Exception):
+    """Substitute lookup failed; status is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize_allergen(allergen: str) -> str:
+    """Cache key for an allergen: lowercased, whitespace collapsed."""
+    return " ".join(allergen.lower().split())
+
+
+def _pairing_alias(entity: dict) -> str:
+    # Prefer entity_alias_readable (properly capitalized) over raw alias slug
+    # The by-alias endpoint expects names like "Mango", "Peanut", "Orange"
+    alias_readable = entity.get("entity_alias_readable", "")
+    alias_slug = entity.get("entity_alias", "")
+    return alias_readable.title() if alias_readable else alias_slug.title()
+
+
+def _fetch_pairing(alias: str, headers: dict) -> Any:
+    return upstream.get(PAIRING_URL, params={"food_pair": alias}, headers=headers)
+
+
+def _run_chain(key: str, headers: dict) -> dict | str:
+    """
+    The FlavorDB chain for one normalized allergen.
+
+    Returns:
+        {"matched_entity", "category", "substitutes": [...]} or a negative reason code
+    """
+    # The pairing alias is almost always the title-cased allergen, so ask for it now
+    speculative_alias = key.title()
+    speculative = _PAIRING_EXECUTOR.submit(_fetch_pairing, speculative_alias, headers) if SPECULATIVE_PAIRING else None
+    try:
+        return _finish_chain(key, headers, speculative, speculative_alias)
+    finally:
+        if speculative is not None:
+            speculative.cancel()  # Unused guess: drop it if it hasn't started yet (no-op once used)
+
+
+def _finish_chain(key: str, headers: dict, speculative: Any, speculative_alias: str) -> dict | str:
+    """_run_chain after the speculative pairing call (if any) was started."""
+    # 1. Search FlavorDB by readable name
+    search_resp = upstream.get(SEARCH_URL, params={"entity_alias_readable": key}, headers=headers)
+    if search_resp.status_code != 200:
+        logger.warning("FlavorDB search failed: status=%s body=%.200s", search_resp.status_code, search_resp.text)
+        raise SubstituteError(f"FlavorDB search failed: {search_resp.status_code}", 500)
+
+    entities = search_resp.json().get("content", [])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[step 1] %d entity match(es): %s", len(entities),
+                     [(e.get("entity_alias_readable"), e.get("category_readable")) for e in entities])
+    if not entities:
+        return NO_ENTITY
+
+    # 2. Dominant category
+    categories = [e.get("category_readable", "") for e in entities if e.get("category_readable")]
+    if not categories:
+        return NO_CATEGORY
+    category_counts = Counter(categories)
+    dominant_category = category_counts.most_common(1)[0][0]
+    logger.debug("[step 2] category counts %s, dominant %r", category_counts, dominant_category)
+
+    # 3. Best entity alias in that category
+    best_entity = next(
+        (e for e in entities if e.get("category_readable") == dominant_category),
+        entities[0]
+    )
+    alias = _pairing_alias(best_entity)
+    logger.debug("[step 3] best entity %r, pairing alias %r", best_entity.get("entity_alias_readable"), alias)
+
+    # 4. Molecularly similar foods via by-alias
+    if speculative is not None and alias == speculative_alias:
+        pairing_resp = speculative.result()
+    else:
+        pairing_resp = _fetch_pairing(alias, headers)
+    if pairing_resp.status_code != 200:
+        logger.warning("FlavorDB pairing failed: status=%s body=%.200s", pairing_resp.status_code, pairing_resp.text)
+        raise SubstituteError(f"FlavorDB pairing failed: {pairing_resp.status_code}", 500)
+
+    similar_entities = pairing_resp.json().get("topSimilarEntities", [])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[step 4] %d similar entities, first %s", len(similar_entities),
+                     [(s.get("entityName"), s.get("category"), s.get("similarMolecules")) for s in similar_entities[:5]])
+
+    # 5. Prefer same-category substitutes if we have at least 2; otherwise top overall
+    same_cat = [
+        e for e in similar_entities
+        if e.get("category", "").lower().replace("-", " ") in dominant_category.lower()
+        or dominant_category.lower() in e.get("category", "").lower()
+    ]
+    top_substitutes = same_cat[:TOP_SUBSTITUTES] if len(same_cat) >= 2 else similar_entities[:TOP_SUBSTITUTES]
+    logger.debug("[step 5] %d same-category matches, using %s", len(same_cat),
+                 [s.get("entityName") for s in top_substitutes])
+
+    return {
+        "matched_entity": best_entity.get("entity_alias_readable"),
+        "category": dominant_category,
+        # Raw FlavorDB entries (only the fields we answer with); formatted per request
+        "substitutes": [
+            {k: s[k] for k in ("entityName", "category", "similarMolecules", "wikipedia") if k in s}
+            for s in top_substitutes
+        ],
+    }
+
+
+def lookup_chain(allergen: str, headers: dict) -> dict | str:
+    """Chain result for an allergen (dict, or a negative reason code): table, then cache, then upstream."""
+    global _table_hits
+    key = normalize_allergen(allergen)
+    precomputed = _table.get(key)
+    if precomputed is not None:
+        _table_hits += 1
+        return precomputed
+
+    cached = SUBSTITUTE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    def load() -> dict | str:
+        # A caller that lost the race may find the leader's answer already stored
+        cached = SUBSTITUTE_CACHE.peek(key)
+        if cached is not MISSING:
+            return cached
+        chain = _run_chain(key, headers)
+        SUBSTITUTE_CACHE.set(key, chain, negative=isinstance(chain, str))
+        return chain
+
+    return _FLIGHT.do(key, load)
+
+
+def format_substitutes(allergen: str, chain: dict) -> dict:
+    """Response body for /api/allergen/substitutes from a chain result."""
+    return {
+        "allergen": allergen,
+        "matched_entity": chain["matched_entity"],
+        "category": chain["category"],
+        "substitutes": [
+            {
+                "name": s["entityName"],
+                "category": s.get("category", ""),
+                "similar_molecules": s.get("similarMolecules", 0),
+                "wikipedia": s.get("wikipedia", ""),
+                "description": (
+                    f"Shares {s.get('similarMolecules', 0)} flavor molecules with {allergen}. "
+                    f"A natural {s.get('category', 'food').lower()} substitute."
+                )
+            }
+            for s in chain["substitutes"]
+        ],
+    }
+
+
+def find_substitutes(allergen: str, headers: dict) -> dict:
+    """
+    Top molecularly-similar substitutes for an allergen.
+
+    Raises:
+        SubstituteError: 404 when FlavorDB has no usable entity, 500 on upstream failure
+    """
+    chain = lookup_chain(allergen, headers)
+    if chain == NO_ENTITY:
+        raise SubstituteError(f"No FlavorDB entity found for '{allergen}'", 404)
+    if chain == NO_CATEGORY:
+        raise SubstituteError("No category data found", 404)
+    return format_substitutes(allergen, chain)
+
+
+# --- Precomputed Table ---
+
+def default_allergens() -> list[str]:
+    """Normalized allergens the UI offers: COMMON_ALLERGENS plus ALLERGEN_SUBSTITUTES keys."""
+    from src.data.mock_data import ALLERGEN_SUBSTITUTES, COMMON_ALLERGENS
+
+    return list(dict.fromkeys(normalize_allergen(a) for a in [*COMMON_ALLERGENS, *ALLERGEN_SUBSTITUTES]))
+
+
+def build_table(allergens: Iterable[str], headers: dict, workers: int = 4) -> dict[str, dict | str]:
+    """Run the chain for every allergen in parallel. Allergens whose lookup fails are left out."""
+    keys = list(dict.fromkeys(normalize_allergen(a) for a in allergens))
+
+    def run(key: str) -> dict | str | None:
+        try:
+            return _run_chain(key, headers)
+        except Exception as e:
+            logger.warning("Substitute table: lookup for %r failed: %s", key, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="substitute-table") as pool:
+        results = list(pool.map(run, keys))
+    return {key: chain for key, chain in zip(keys, results) if chain is not None}
+
+
+def load_table(path: str | None = None) -> int:
+    """
+    Load a persisted table (missing or unreadable files are ignored). Returns the entry count.
+    Negative entries written by older versions are dropped.
+    """
+    global _table
+    path = path if path is not None else SUBSTITUTE_TABLE_PATH
+    if not path:
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable substitute table %s: %s", path, e)
+        return 0
+    if data.get("version") != TABLE_VERSION:
+        logger.warning("Ignoring substitute table %s with version %r", path, data.get("version"))
+        return 0
+    _table = {key: chain for key, chain in data.get("entries", {}).items() if isinstance(chain, dict)}
+    return len(_table)
+
+
+def save_table(table: dict[str, dict], path: str | None = None) -> None:
+    """
+    Persist the table atomically (write to a uniquely named temp file, then rename),
+    so concurrent writers (reloader, several workers) never share a temp file.
+    No-op for an empty path.
+    """
+    path = path if path is not None else SUBSTITUTE_TABLE_PATH
+    if not path:
+        return
+    tmp = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+                                      prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            json.dump({"version": TABLE_VERSION, "built_at": time.time(), "entries": table}, tmp, indent=1, sort_keys=True)
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+
+def warm_table(headers: dict, allergens: Iterable[str] | None = None, path: str | None = None,
+               refresh: bool = False, load: bool = True) -> int:
+    """
+    Load the persisted table, look up the allergens it is missing (all of them if
+    refresh) and persist the result if anything new was found. Misses go to
+    SUBSTITUTE_CACHE as negatives instead of into the table.
+
+    Args:
+        load: False if the caller already ran load_table(path)
+
+    Returns:
+        Number of entries in the table
+    """
+    global _table
+    if load:
+        load_table(path)
+    wanted = list(allergens) if allergens is not None else default_allergens()
+    missing = [a for a in wanted if refresh or normalize_allergen(a) not in _table]
+    if missing:
+        looked_up = build_table(missing, headers)
+        for key, chain in looked_up.items():
+            if isinstance(chain, str):
+                SUBSTITUTE_CACHE.set(key, chain, negative=True)
+        fresh = {key: chain for key, chain in looked_up.items() if isinstance(chain, dict)}
+        if fresh:
+            _table = {**_table, **fresh}
+            try:
+                save_table(_table, path)
+            except OSError as e:
+                logger.warning("Could not persist substitute table: %s", e)
+    logger.info("Substitute table ready: %d entries (%d looked up)", len(_table), len(missing))
+    return len(_table)
+
+
+def start_warmup(headers: dict) -> threading.Thread:
+    """Fill in missing allergens on a background thread (call load_table first)."""
+    thread = threading.Thread(target=warm_table, args=(headers,), kwargs={"load": False},
+                              name="substitute-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def stats() -> dict[str, Any]:
+    return {
+        "table": {"size": len(_table), "hits": _table_hits, "path": SUBSTITUTE_TABLE_PATH},
+        "cache": SUBSTITUTE_CACHE.stats(),
+        "singleflight": _FLIGHT.stats(),
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from logging_setup import configure_logging
+
+    load_dotenv()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Build the precomputed allergen substitute table.")
+    parser.add_argument("--refresh", action="store_true", help="re-query every allergen instead of only missing ones")
+    parser.add_argument("--path", default=SUBSTITUTE_TABLE_PATH, help="table file (default: %(default)s)")
+    parser.add_argument("allergens", nargs="*", help="allergens to include (default: COMMON_ALLERGENS + ALLERGEN_SUBSTITUTES)")
+    args = parser.parse_args()
+
+    cli_headers = {"Authorization": f"Bearer {os.getenv('API_KEY', '')}", "Accept": "application/json"}
+    warm_table(cli_headers, allergens=args.allergens or None, path=args.path, refresh=args.refresh)
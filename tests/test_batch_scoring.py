@@ -0,0 +1,82 @@
+import heapq
+import random
+
+import numpy as np
+import pytest
+
+import batch_scoring
+import flavor_bridge as fb
+
+TITLES = ["Beef Stew", "Chicken Curry", "Vegetable Soup", "Garlic Shrimp Pasta", "Fresh Salad",
+          "Crispy Fried Tofu", "Pork Noodles", "Lentil Biryani", "Salmon Bake", "Mushroom Risotto"]
+STEPS = ["heat", "simmer", "stir", "fry", "bake", "boil", "chop", "blend", "braise", "roast", "add",
+         "fold", "reduce", "add garlic", "add butter", "add milk", "add tomato", "add onion", "add beef",
+         "add lemon juice", "add olive oil", "add soy sauce", "grill", "steam", "mash", "knead"]
+
+
+def _recipes(count, seed):
+    rng = random.Random(seed)
+    recipes = [
+        {
+            "Recipe_id": f"batch-{seed}-{i}",
+            "Recipe_title": f"{rng.choice(TITLES)} {i}",
+            "Processes": "||".join(rng.sample(STEPS, rng.randint(1, 8))),
+        }
+        for i in range(count)
+    ]
+    # Exact duplicates (other ids) tie on score; ties must keep candidate order
+    return recipes + [{**r, "Recipe_id": r["Recipe_id"] + "-dup"} for r in recipes[:5]]
+
+
+def _sources(seed):
+    rng = random.Random(seed)
+    return [fb.build_recipe_profile(title, rng.sample(STEPS, 5), f"batch-src-{i}") for i, title in enumerate(TITLES)]
+
+
+def test_scores_match_match_score():
+    profiles = [fb._target_profile(r) for r in _recipes(80, seed=1)]
+    batch = fb.pack_candidates(profiles)
+    for source in _sources(seed=2):
+        expected = np.array([fb.match_score(source, p) for p in profiles])
+        assert np.abs(batch_scoring.score_batch(source, batch).final_score - expected).max() < 1e-12
+
+
+def test_similarity_metrics_match_score_recipe():
+    profiles = [fb._target_profile(r) for r in _recipes(40, seed=3)]
+    batch = fb.pack_candidates(profiles)
+    for source in _sources(seed=4):
+        scores = batch_scoring.score_batch(source, batch)
+        for i, profile in enumerate(profiles):
+            expected = fb.score_recipe(source, profile)[2]
+            for name, value in scores.similarity_metrics(i).items():
+                assert value == pytest.approx(expected[name], abs=0.1), name
+
+
+@pytest.mark.parametrize("excluded", [[], ["beef"], ["chicken", "shrimp"]])
+@pytest.mark.parametrize("top_k", [1, 3, 10, 200])
+def test_top_candidates_match_heap_loop(excluded, top_k):
+    profiles = [fb._target_profile(r) for r in _recipes(60, seed=5)]
+    batch = fb.pack_candidates(profiles)
+    mask = fb.excluded_title_ingredient_mask(excluded)
+    for source in _sources(seed=6):
+        kept = [(fb.match_score(source, p), i) for i, p in enumerate(profiles) if not p.title_ingredient_mask & mask]
+        expected = [i for _, i in heapq.nlargest(top_k, kept, key=lambda c: c[0])]
+        ranked, scored = batch_scoring.top_candidates(source, batch, mask, top_k)
+        assert [i for _, i in ranked] == expected
+        assert scored == len(kept)
+
+
+@pytest.mark.parametrize("excluded", [[], ["beef", "pork"]])
+def test_batched_ranking_matches_looped(excluded):
+    recipes = _recipes(20, seed=7)  # Below BATCH_SCORING_MIN_CANDIDATES: loops unless handed a batch
+    for source in _sources(seed=8):
+        looped = fb._rank_target_recipes(source, recipes, "Test", excluded, 5)
+        batched = fb._rank_target_recipes(source, recipes, "Test", excluded, 5, fb._candidate_batch(recipes))
+        assert batched == looped
+
+
+def test_batch_for_memoizes_by_list_identity():
+    recipes = _recipes(10, seed=9)
+    batch = fb._candidate_batch(recipes)
+    assert fb._candidate_batch(recipes) is batch
+    assert fb._candidate_batch(list(recipes)) is not batch
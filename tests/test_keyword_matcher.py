@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import flavor_bridge as fb
+import keyword_matcher
+from keyword_matcher import KeywordAutomaton
+
+OVERLAPPING = ["he", "she", "his", "hers", "her", "s", "slow cook", "cook", "coconut milk", "milk"]
+
+TEXTS = [
+    "",
+    "ushers",
+    "shishers hershe",
+    "slow cooked coconut milk with cookies",
+    "simmer the chicken, then braise slowly; fold in sour cream and serve over rice noodles",
+    "Crispy fried tofu with toasted nuts",  # Mixed case: matching is case-sensitive
+]
+
+
+def _pure_python(keywords):
+    original = keyword_matcher.ahocorasick
+    keyword_matcher.ahocorasick = None
+    try:
+        return KeywordAutomaton(keywords)
+    finally:
+        keyword_matcher.ahocorasick = original
+
+
+def _random_texts(keywords, count=200, seed=5):
+    rng = random.Random(seed)
+    fillers = ["", " ", "and ", "x", "the ", ", "]
+    return [
+        "".join(rng.choice(keywords) + rng.choice(fillers) for _ in range(rng.randint(0, 12)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("keywords", [OVERLAPPING, list(fb.KEYWORD_AUTOMATON.keywords)])
+def test_matches_equal_substring_checks(keywords):
+    automata = [KeywordAutomaton(keywords), _pure_python(keywords)]
+    for text in TEXTS + _random_texts(keywords):
+        expected = {kw for kw in keywords if kw in text}
+        for automaton in automata:
+            assert automaton.matches(text) == expected, text
+
+
+def test_iter_matches_finds_every_occurrence():
+    automata = [KeywordAutomaton(OVERLAPPING), _pure_python(OVERLAPPING)]
+    for text in TEXTS + _random_texts(OVERLAPPING):
+        expected = sorted(
+            (start + len(kw), kw)
+            for kw in set(OVERLAPPING)
+            for start in range(len(text))
+            if text.startswith(kw, start)
+        )
+        for automaton in automata:
+            assert sorted(automaton.iter_matches(text)) == expected, text
+
+
+def test_fallback_skips_empty_and_duplicate_keywords():
+    automaton = _pure_python(["", "rice", "rice", "ice"])
+    assert automaton.keywords == ("rice", "ice")
+    assert automaton.matches("fried rice") == {"rice", "ice"}
+    assert _pure_python([]).matches("anything") == set()
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import flavor_bridge as fb
+
+RECIPES = [
+    ("Hearty Beef Stew", ["Brown the beef in butter", "Add onion and garlic", "Simmer for 2 hours until tender"]),
+    ("Crispy Fried Chicken", ["Dredge chicken in flour", "Fry in hot oil until golden and crisp"]),
+    ("Fresh Garden Salad", ["Chop the tomato and cucumber", "Toss with olive oil and lemon"]),
+    ("Vegetable Curry", ["Heat oil", "Add coconut milk and simmer", "Serve with rice"]),
+    ("Pizza", []),
+    ("", ["cook"]),
+    # Keywords spanning the title/instructions join ("slow cook", "sour cream")
+    ("Pork Shoulder Slow", ["cook overnight with stock", "Stir in sour"]),
+    ("Mushroom Risotto with Sour", ["cream, stir, then fold in cheese and reduce"]),
+    # ... and the instructions/extracted-ingredients join used by the texture profile
+    ("Lentil Soup", ["Warm the milk, then add coconut"]),
+]
+
+
+def _random_recipes(count=60, seed=3):
+    rng = random.Random(seed)
+    words = list(fb.KEYWORD_AUTOMATON.keywords) + ["the", "and", "with", "until", "Golden", "Slowly"]
+    recipes = []
+    for _ in range(count):
+        title = " ".join(rng.choice(words) for _ in range(rng.randint(0, 5)))
+        steps = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 10))) for _ in range(rng.randint(0, 5))]
+        recipes.append((title.title() if rng.random() < 0.5 else title, steps))
+    return recipes
+
+
+@pytest.mark.parametrize("title,instructions", RECIPES + _random_recipes())
+def test_profile_matches_detectors(title, instructions):
+    profile = fb.build_recipe_profile(title, instructions, recipe_id="test-profile")
+    extracted = fb.extract_ingredients_from_instructions(instructions)
+    method = fb.detect_cooking_method(instructions)
+
+    assert profile.method == method
+    assert profile.protein == fb.detect_protein(title)
+    assert dict(profile.flavor_vector) == fb._infer_flavor_style(title, method)
+    assert list(profile.ingredients) == fb._get_ingredients_from_title(title)
+    assert list(profile.ingredients_extracted) == extracted
+    assert profile.comfort_level == fb.detect_comfort_level(title, instructions, method)
+    assert dict(profile.texture_profile) == fb.detect_texture_profile(title, instructions, extracted)
+    assert (profile.common_techniques, profile.complex_techniques) == fb._technique_counts(
+        {"instructions": instructions}
+    )
+    assert fb.decode_ingredient_mask(profile.ingredient_mask) == extracted
+
+
+def test_profiles_are_memoized_by_content():
+    first = fb.build_recipe_profile("Beef Stew", ["simmer"], recipe_id="memo")
+    assert fb.build_recipe_profile("Beef Stew", ["simmer"], recipe_id="memo") is first
+    assert fb.build_recipe_profile("Beef Stew", ["braise"], recipe_id="memo") is not first
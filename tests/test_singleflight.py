@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from singleflight import AsyncSingleFlight
+
+
+def test_async_calls_share_one_execution():
+    group = AsyncSingleFlight("test_share")
+    runs = 0
+
+    async def fetch():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert runs == 1
+    assert group.stats()["coalesced"] == 4
+    assert group.in_flight() == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    group = AsyncSingleFlight("test_cancel_leader")
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+    assert group.in_flight() == 0
+
+
+def test_errors_reach_every_caller():
+    group = AsyncSingleFlight("test_errors")
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group.in_flight() == 0
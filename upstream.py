@@ -0,0 +1,171 @@
+"""
+Shared upstream HTTP client for Foodoscope / FlavorDB calls.
+One pooled, keep-alive session is reused by every call site so repeat
+requests skip the TCP+TLS handshake.
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+# --- Pool / Timeout Configuration ---
+POOL_CONNECTIONS = int(os.getenv("UPSTREAM_POOL_CONNECTIONS", "10"))  # Number of per-host pools kept alive
+POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "20"))  # Max open connections per host
+POOL_BLOCK = os.getenv("UPSTREAM_POOL_BLOCK", "false").lower() in ("1", "true", "yes")  # Wait instead of exceeding POOL_MAXSIZE
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "1"))  # Connect-level retries only
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+# httpx.AsyncClient pools are bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+
+
+def _build_session() -> requests.Session:
+    """Create a session with a tuned, keep-alive connection pool."""
+    session = requests.Session()
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,
+        status=0,
+        backoff_factor=0.1,
+        allowed_methods=frozenset(["GET"]),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=POOL_BLOCK,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide upstream session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url: str, params: dict | None = None, headers: dict | None = None,
+        timeout: float | tuple[float, float] | None = None) -> requests.Response:
+    """GET through the shared pool. Defaults to (CONNECT_TIMEOUT, READ_TIMEOUT)."""
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    start = time.perf_counter()
+    status = None
+    try:
+        response = get_session().get(url, params=params, headers=headers, timeout=timeout)
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe_upstream(url, time.perf_counter() - start, status)
+
+
+def get_async_client() -> Any:
+    """
+    Return the httpx.AsyncClient for the running event loop, creating it on first use.
+    Uses the same pool limits and timeouts as the sync session.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                max_keepalive_connections=POOL_MAXSIZE,
+            ),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES),
+            headers={"Connection": "keep-alive"},
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aget(url: str, params: dict | None = None, headers: dict | None = None,
+               timeout: float | None = None) -> Any:
+    """Async GET through the event loop's shared httpx pool."""
+    client = get_async_client()
+    start = time.perf_counter()
+    status = None
+    try:
+        if timeout is None:
+            response = await client.get(url, params=params, headers=headers)
+        else:
+            response = await client.get(url, params=params, headers=headers, timeout=timeout)
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe_upstream(url, time.perf_counter() - start, status)
+
+
+async def aclose() -> None:
+    """Close the running loop's async client (call from the ASGI shutdown hook)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def pool_stats() -> dict[str, Any]:
+    """
+    Connection reuse stats for every host pool currently held by the session.
+
+    Returns:
+        {"hosts": {host: {...}}, "requests": n, "new_connections": n, "reused_connections": n}
+    """
+    hosts: dict[str, dict[str, int]] = {}
+    if _session is not None:
+        seen = set()
+        for adapter in _session.adapters.values():
+            if id(adapter) in seen or not hasattr(adapter, "poolmanager"):
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                num_requests = getattr(pool, "num_requests", 0)
+                num_connections = getattr(pool, "num_connections", 0)
+                hosts[host] = {
+                    "requests": num_requests,
+                    "new_connections": num_connections,
+                    "reused_connections": max(0, num_requests - num_connections),
+                    "idle_connections": pool.pool.qsize() if pool.pool is not None else 0,
+                }
+
+    total_requests = sum(h["requests"] for h in hosts.values())
+    total_new = sum(h["new_connections"] for h in hosts.values())
+    return {
+        "pool_connections": POOL_CONNECTIONS,
+        "pool_maxsize": POOL_MAXSIZE,
+        "pool_block": POOL_BLOCK,
+        "timeouts": {"connect": CONNECT_TIMEOUT, "read": READ_TIMEOUT},
+        "requests": total_requests,
+        "new_connections": total_new,
+        "reused_connections": max(0, total_requests - total_new),
+        "hosts": hosts,
+    }